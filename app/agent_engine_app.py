@@ -68,7 +68,11 @@ class AgentEngineApp(AdkApp):
         """Unary query method for standard HTTP clients."""
         # Pipeline timeout: 5 minutes max for a complete grading run
         pipeline_timeout = int(os.environ.get("PIPELINE_TIMEOUT_SECONDS", 300))
-        events = []
+        # Fold state deltas in as events stream past instead of buffering the
+        # whole trace; only the last event is kept.
+        accumulated_state_delta: dict[str, Any] = {}
+        last_event = None
+        event_count = 0
         try:
             async with asyncio.timeout(pipeline_timeout):
                 async for event in self.async_stream_query(
@@ -77,7 +81,13 @@ class AgentEngineApp(AdkApp):
                     session_id=session_id,
                     run_config=run_config,
                 ):
-                    events.append(event)
+                    event_count += 1
+                    last_event = event
+                    if not isinstance(event, dict):
+                        continue
+                    actions = event.get("actions")
+                    if actions and (state_delta := actions.get("state_delta")):
+                        accumulated_state_delta.update(state_delta)
         except TimeoutError:
             logger.error(
                 "Pipeline timed out after %d seconds for session %s",
@@ -85,24 +95,17 @@ class AgentEngineApp(AdkApp):
             )
             return {
                 "error": f"Pipeline timed out after {pipeline_timeout} seconds",
-                "partial_events": len(events),
+                "partial_events": event_count,
             }
 
-        if not events:
+        if last_event is None:
             return {}
 
-        # Accumulate all state deltas from the event stream
-        accumulated_state_delta = {}
-        for event in events:
-            if isinstance(event, dict) and event.get("actions", {}).get("state_delta"):
-                accumulated_state_delta.update(event["actions"]["state_delta"])
-
-        final_event = dict(events[-1])
-        if "actions" not in final_event:
-            final_event["actions"] = {}
-        else:
-            final_event["actions"] = dict(final_event["actions"])
-        final_event["actions"]["state_delta"] = accumulated_state_delta
+        final_event = dict(last_event)
+        final_event["actions"] = {
+            **(final_event.get("actions") or {}),
+            "state_delta": accumulated_state_delta,
+        }
         return final_event
 
 
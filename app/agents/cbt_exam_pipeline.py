@@ -1,17 +1,15 @@
 import logging
 
 from google.adk.agents import Agent, SequentialAgent
-from google.adk.models.google_llm import Gemini
-
-from app.toolsets import retry_config
 
+from app.app_utils.genai_client import SharedClientGemini
 from app.callbacks import generic_callback, skip_if_extract_only
 
 logger = logging.getLogger(__name__)
 
 topic_extraction_agent = Agent(
     name="TopicExtractionAgent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=SharedClientGemini(model="gemini-2.5-flash-lite"),
     instruction=(
         "<role>\n"
         "You are the TopicExtractionAgent, an elite academic content parser and educational researcher. "
@@ -31,7 +29,7 @@ topic_extraction_agent = Agent(
 
 question_generation_agent = Agent(
     name="QuestionGenerationAgent",
-    model=Gemini(model="gemini-2.5-flash", retry_options=retry_config),
+    model=SharedClientGemini(model="gemini-2.5-flash"),
     instruction=(
         "<role>\n"
         "You are a senior academic curriculum mapping specialist. Your expertise lies in crafting challenging, curriculum-aligned assessments that definitively test human comprehension.\n"
@@ -1,13 +1,19 @@
 import logging
 
 from google.adk.agents import Agent, SequentialAgent
-from google.adk.models.google_llm import Gemini
 
 from app.agents.shared_agents import (
     create_smart_prep_agent,
     create_weakness_detection_agent,
 )
-from app.callbacks import generic_callback, deterministic_mcq_grading
+from app.app_utils.genai_client import SharedClientGemini
+from app.callbacks import (
+    deterministic_mcq_grading,
+    generic_callback,
+    merge_cbt_results,
+    narration_after_callback,
+    skip_essay_grading_if_none,
+)
 from app.prompts import (
     ATTEMPT_RETRIEVAL_PROMPT,
     ESSAY_GRADING_PROMPT,
@@ -15,14 +21,14 @@ from app.prompts import (
     MCQ_GRADING_PROMPT,
     RESULT_PERSISTENCE_PROMPT,
 )
-from app.toolsets import mongo_mcp_toolset, retry_config
+from app.toolsets import mongo_mcp_toolset
 
 logger = logging.getLogger(__name__)
 
 
 attempt_retrieval_agent = Agent(
     name="AttemptRetrievalAgent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=SharedClientGemini(model="gemini-2.5-flash-lite"),
     instruction=ATTEMPT_RETRIEVAL_PROMPT,
     tools=[mongo_mcp_toolset],
     output_key="attempt_context_raw",
@@ -31,7 +37,7 @@ attempt_retrieval_agent = Agent(
 
 mcq_grading_agent = Agent(
     name="MCQGradingAgent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=SharedClientGemini(model="gemini-2.5-flash-lite"),
     instruction=MCQ_GRADING_PROMPT,
     output_key="mcq_results_raw",
     before_agent_callback=deterministic_mcq_grading,
@@ -40,24 +46,26 @@ mcq_grading_agent = Agent(
 
 essay_grading_agent = Agent(
     name="EssayGradingAgent",
-    model=Gemini(model="gemini-2.5-flash", retry_options=retry_config),
+    model=SharedClientGemini(model="gemini-2.5-flash"),
     instruction=ESSAY_GRADING_PROMPT,
     tools=[mongo_mcp_toolset],
     output_key="essay_results_raw",
+    before_agent_callback=skip_essay_grading_if_none,
     after_agent_callback=generic_callback("essay_results_group"),
 )
 
 feedback_narration_agent = Agent(
     name="FeedbackNarrationAgent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=SharedClientGemini(model="gemini-2.5-flash-lite"),
     instruction=FEEDBACK_NARRATION_PROMPT,
     output_key="grading_summary_raw",
-    after_agent_callback=generic_callback("grading_summary"),
+    before_agent_callback=merge_cbt_results,
+    after_agent_callback=narration_after_callback,
 )
 
 result_persistence_agent = Agent(
     name="ResultPersistenceAgent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=SharedClientGemini(model="gemini-2.5-flash-lite"),
     instruction=RESULT_PERSISTENCE_PROMPT,
     tools=[mongo_mcp_toolset],
     output_key="final_grading_payload_raw",
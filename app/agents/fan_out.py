@@ -0,0 +1,176 @@
+import asyncio
+import contextlib
+import json
+import logging
+import re
+import typing
+from collections.abc import AsyncGenerator, Callable, Sequence
+
+from google.adk.agents import BaseAgent, InvocationContext
+from google.adk.events import Event, EventActions
+
+from app.app_utils.common import _load_json
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def _branch_context(
+    parent: BaseAgent,
+    agent: BaseAgent,
+    ctx: InvocationContext,
+    label: str | None = None,
+) -> InvocationContext:
+    """Give each concurrent child its own branch so histories don't interleave.
+
+    The branch is named after ``agent`` unless a ``label`` is given.
+    """
+    branch_ctx = ctx.model_copy()
+    suffix = f"{parent.name}.{label or agent.name}"
+    branch_ctx.branch = f"{ctx.branch}.{suffix}" if ctx.branch else suffix
+    return branch_ctx
+
+
+class ConcurrentRuns:
+    """Merges the event streams of agents that may be submitted while iterating.
+
+    Each child waits until its last event has been yielded to the runner before
+    producing the next one, so state deltas are committed in the same order the
+    child would see them when running alone.
+    """
+
+    def __init__(self, parent: BaseAgent, ctx: InvocationContext) -> None:
+        self._parent = parent
+        self._ctx = ctx
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self._pending = 0
+        self.finished: set[str] = set()
+
+    def submit(
+        self, agent: BaseAgent, semaphore: asyncio.Semaphore | None = None
+    ) -> None:
+        self._pending += 1
+        self._tasks.append(asyncio.create_task(self._drive(agent, semaphore)))
+
+    async def _drive(
+        self, agent: BaseAgent, semaphore: asyncio.Semaphore | None
+    ) -> None:
+        try:
+            async with semaphore or contextlib.nullcontext():
+                async for event in agent.run_async(
+                    _branch_context(self._parent, agent, self._ctx)
+                ):
+                    processed = asyncio.Event()
+                    await self._queue.put((event, processed))
+                    await processed.wait()
+        except Exception as e:
+            await self._queue.put((_DONE, (agent.name, e)))
+            return
+        await self._queue.put((_DONE, (agent.name, None)))
+
+    async def events(
+        self, idle_timeout: float | None = None
+    ) -> AsyncGenerator[Event | None, None]:
+        """Yield child events until every submitted run has finished.
+
+        ``None`` is yielded whenever a run finishes or ``idle_timeout`` seconds pass
+        without an event, giving the caller a chance to submit more work.
+        """
+        try:
+            while self._pending:
+                try:
+                    item, payload = await asyncio.wait_for(
+                        self._queue.get(), idle_timeout
+                    )
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if item is _DONE:
+                    name, error = payload
+                    if error is not None:
+                        raise error
+                    self._pending -= 1
+                    self.finished.add(name)
+                    yield None
+                    continue
+                yield item
+                payload.set()
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+
+async def run_concurrently(
+    parent: BaseAgent,
+    agents: Sequence[BaseAgent],
+    ctx: InvocationContext,
+    max_concurrency: int,
+) -> AsyncGenerator[Event, None]:
+    """Run ``agents`` concurrently (at most ``max_concurrency`` at once) and merge their events."""
+    runs = ConcurrentRuns(parent, ctx)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    for agent in agents:
+        runs.submit(agent, semaphore)
+    async for event in runs.events():
+        if event is not None:
+            yield event
+
+
+class ParallelLoopAgent(BaseAgent):
+    """Runs one agent per item of a state list concurrently, preserving input order.
+
+    ``agent_factory(index)`` builds the agent for ``state[items_key][index]``; that
+    agent must write its result (JSON text or an output_schema dict) to
+    ``item_output_key.format(index=index)``.
+    The parsed results are collected, in input order, into ``state[output_key]``.
+    """
+
+    items_key: str
+    item_output_key: str
+    output_key: str
+    agent_factory: Callable[[int], BaseAgent]
+    max_concurrency: int = 8
+
+    def item_index(self, state_key: str) -> int | None:
+        """Return the item index if ``state_key`` is one of this agent's item outputs."""
+        prefix, _, suffix = self.item_output_key.partition("{index}")
+        match = re.fullmatch(rf"{re.escape(prefix)}(\d+){re.escape(suffix)}", state_key)
+        return int(match.group(1)) if match else None
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        items = ctx.session.state.get(self.items_key) or []
+        agents = [self.agent_factory(index) for index in range(len(items))]
+        logger.info(
+            "%s: fanning out %d items (max %d concurrent)",
+            self.name,
+            len(agents),
+            self.max_concurrency,
+        )
+        async for event in run_concurrently(self, agents, ctx, self.max_concurrency):
+            yield event
+
+        results: list[typing.Any] = []
+        for index in range(len(agents)):
+            key = self.item_output_key.format(index=index)
+            raw = ctx.session.state.get(key)
+            if not raw:
+                raise ValueError(
+                    f"CRITICAL: {self.name} produced no output for '{key}'."
+                )
+            try:
+                results.append(_load_json(raw))
+            except json.JSONDecodeError as e:
+                raise ValueError(
+                    f"CRITICAL: {self.name} output for '{key}' is not valid JSON: {e}"
+                ) from e
+
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={self.output_key: results}),
+        )
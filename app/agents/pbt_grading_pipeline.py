@@ -12,21 +12,43 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import json
 import logging
+import typing
+from collections.abc import AsyncGenerator, Callable
 
-from google.adk.agents import Agent, SequentialAgent
-from google.adk.models.google_llm import Gemini
-from google.adk.tools import AgentTool, google_search
+import pydantic
+from google.adk.agents import Agent, BaseAgent, InvocationContext, SequentialAgent
+from google.adk.agents.llm_agent import InstructionProvider
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.events import Event, EventActions
+from google.adk.tools import google_search
+from google.genai import types
 
+from app.agents.fan_out import ConcurrentRuns, ParallelLoopAgent, _branch_context
 from app.agents.shared_agents import (
     create_smart_prep_agent,
     create_weakness_detection_agent,
 )
+from app.app_utils.answer_cache import normalize_question
+from app.app_utils.coalesce import InflightCoalescer
+from app.app_utils.common import _load_json
+from app.app_utils.genai_client import SharedClientGemini
+from app.app_utils.typing import GradedQuestion, RefereeReport, Summary
 from app.callbacks import (
+    answer_cache_lookup,
+    answer_cache_store,
     final_after_callback,
+    final_before_callback,
     grading_after_callback,
+    instruction_only,
     preprocessing_after_callback,
     referee_after_callback,
+    skip_retrieval_if_rubric_covers,
+    skip_summary_on_cache_hit,
+    tool_cache_lookup,
+    tool_cache_store,
 )
 from app.prompts import (
     FINAL_AGGREGATOR_PROMPT,
@@ -40,7 +62,6 @@ from app.toolsets import (
     custom_mcp_toolset,
     gcs_mcp_toolset,
     mongo_mcp_toolset,
-    retry_config,
 )
 
 logger = logging.getLogger(__name__)
@@ -51,53 +72,492 @@ logger = logging.getLogger(__name__)
 # ---------------------------------------------------------------------------
 preprocessing_agent = Agent(
     name="PreprocessingAgent",
-    model=Gemini(model="gemini-2.5-flash", retry_options=retry_config),
+    model=SharedClientGemini(model="gemini-2.5-flash"),
     instruction=PREPROCESSING_PROMPT,
     tools=[custom_mcp_toolset, mongo_mcp_toolset, gcs_mcp_toolset],
     output_key="preprocessing_context",
     after_agent_callback=preprocessing_after_callback,
+    before_tool_callback=tool_cache_lookup,
+    after_tool_callback=tool_cache_store,
 )
 
-online_answers_agent = Agent(
-    name="OnlineAnswersAgent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
-    instruction=ONLINE_ANSWERS_PROMPT,
-    tools=[google_search],
-    output_key="online_answers",
-)
+# Shared across the per-question agents (all Gemini models also share one genai Client).
+_retrieval_model = SharedClientGemini(model="gemini-2.5-flash-lite")
+_grader_model = SharedClientGemini(model="gemini-2.5-flash")
 
-summarizer_agent = Agent(
-    name="SummarizerAgent",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
-    instruction=SUMMARIZER_PROMPT,
-    output_key="final_summary",
-)
+# Search results are short, bounded snippets: cap decode length and sample
+# greedily. google_search cannot be combined with a JSON response MIME type.
+_retrieval_config = types.GenerateContentConfig(max_output_tokens=768, temperature=0.0)
+
+
+def _question_instruction(
+    prompt: str, index: int, *, question_only: bool = False, **inputs: str
+) -> InstructionProvider:
+    """Append the index-th question plus the named state keys to ``prompt`` as JSON.
+
+    Each value in ``inputs`` is a state key, optionally templated with ``{index}``.
+    This payload is all the per-question agents need, so they send no session
+    history (which holds the whole preprocessing trace) along with it.
+
+    With ``question_only`` only the question id and text are sent. The retrieval
+    agents use it: their summary is cached and coalesced by question text, so it
+    must not depend on (or leak) any one student's answer.
+    """
+
+    def instruction(ctx: ReadonlyContext) -> str:
+        question = ctx.state["questions"][index]
+        payload: dict[str, typing.Any]
+        if question_only:
+            payload = {
+                "question_id": question.get("question_id"),
+                "question": question.get("question"),
+            }
+        else:
+            payload = {"question": question}
+        for name, key in inputs.items():
+            payload[name] = ctx.state.get(key.format(index=index))
+        return f"{prompt}\n\nINPUT:\n{json.dumps(payload, ensure_ascii=False)}"
+
+    return instruction
+
+
+def create_online_answers_agent(index: int) -> Agent:
+    return Agent(
+        name=f"OnlineAnswersAgent_{index}",
+        model=_retrieval_model,
+        instruction=_question_instruction(
+            ONLINE_ANSWERS_PROMPT, index, question_only=True
+        ),
+        tools=[google_search],
+        generate_content_config=_retrieval_config,
+        include_contents="none",
+        before_model_callback=instruction_only,
+        output_key=f"online_answers_{index}",
+        before_agent_callback=answer_cache_lookup(index),
+    )
+
+
+def create_summarizer_agent(index: int) -> Agent:
+    return Agent(
+        name=f"SummarizerAgent_{index}",
+        model=_retrieval_model,
+        instruction=_question_instruction(
+            SUMMARIZER_PROMPT,
+            index,
+            question_only=True,
+            online_answers="online_answers_{index}",
+        ),
+        output_schema=Summary,
+        include_contents="none",
+        before_model_callback=instruction_only,
+        output_key=f"final_summary_{index}",
+        before_agent_callback=skip_summary_on_cache_hit(index),
+        after_agent_callback=answer_cache_store(index),
+    )
+
+
+def create_question_grader_agent(index: int) -> Agent:
+    return Agent(
+        name=f"QuestionGrader_{index}",
+        model=_grader_model,
+        instruction=_question_instruction(
+            GRADER_PROMPT_BASE,
+            index,
+            rubric="rubric",
+            historical_performance="historical_performance",
+            external_evidence="final_summary_{index}",
+        ),
+        output_schema=GradedQuestion,
+        include_contents="none",
+        before_model_callback=instruction_only,
+        output_key=f"graded_question_{index}",
+    )
+
+
+# Process-wide, so identical questions from concurrently graded scripts share one search.
+_retrieval_inflight = InflightCoalescer()
+
+
+class CoalescedRetrievalAgent(BaseAgent):
+    """Runs the retrieve + summarise sub-agents once per distinct in-flight question.
+
+    A chain whose question is already being retrieved elsewhere in this process
+    waits for that summary and writes it to ``output_key`` instead of searching.
+    """
 
-grading_agent = Agent(
+    index: int
+    output_key: str
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        question = ctx.session.state["questions"][self.index].get("question", "")
+        key = InflightCoalescer.key(
+            _retrieval_model.model, normalize_question(str(question))
+        )
+        pending = _retrieval_inflight.pending(key)
+        if pending is not None:
+            try:
+                summary = await asyncio.shield(pending)
+            except Exception as e:
+                logger.warning(
+                    "%s: in-flight retrieval unavailable, retrieving: %s", self.name, e
+                )
+                summary = None
+            if summary:
+                logger.info(
+                    "%s: reused in-flight retrieval for the same question", self.name
+                )
+                yield Event(
+                    invocation_id=ctx.invocation_id,
+                    author=self.name,
+                    branch=ctx.branch,
+                    actions=EventActions(state_delta={self.output_key: summary}),
+                )
+                return
+
+        with _retrieval_inflight.lead(key) as future:
+            for agent in self.sub_agents:
+                async for event in agent.run_async(ctx):
+                    yield event
+            future.set_result(ctx.session.state.get(self.output_key))
+
+
+def create_retrieval_agent(index: int) -> CoalescedRetrievalAgent:
+    return CoalescedRetrievalAgent(
+        name=f"Retrieval_{index}",
+        index=index,
+        output_key=f"final_summary_{index}",
+        sub_agents=[create_online_answers_agent(index), create_summarizer_agent(index)],
+        before_agent_callback=skip_retrieval_if_rubric_covers(index),
+    )
+
+
+class PerQuestionChain(SequentialAgent):
+    """Retrieve, summarise and grade a single question."""
+
+    pass
+
+
+def create_question_chain(index: int) -> PerQuestionChain:
+    return PerQuestionChain(
+        name=f"QuestionChain_{index}",
+        sub_agents=[
+            create_retrieval_agent(index),
+            create_question_grader_agent(index),
+        ],
+    )
+
+
+grading_agent = ParallelLoopAgent(
     name="GradingAgent",
-    model=Gemini(model="gemini-2.5-flash", retry_options=retry_config),
-    instruction=GRADER_PROMPT_BASE,
-    tools=[AgentTool(online_answers_agent), AgentTool(summarizer_agent)],
-    sub_agents=[online_answers_agent, summarizer_agent],
-    output_key="graded_result",
+    items_key="questions",
+    item_output_key="graded_question_{index}",
+    output_key="graded_questions",
+    agent_factory=create_question_chain,
+    max_concurrency=8,
     after_agent_callback=grading_after_callback,
 )
 
-referee_agent = Agent(
+_referee_model = SharedClientGemini(model="gemini-2.5-flash")
+
+LOW_CONFIDENCE_THRESHOLD = 0.7
+
+
+def _referee_instruction(graded: list[dict[str, typing.Any]]) -> InstructionProvider:
+    """Render the batch with each item's question and answer, which the referee checks against."""
+
+    def instruction(ctx: ReadonlyContext) -> str:
+        questions = {q.get("question_id"): q for q in ctx.state.get("questions") or []}
+        items = []
+        for item in graded:
+            question = questions.get(item.get("question_id"), {})
+            items.append(
+                {
+                    **item,
+                    "question": question.get("question"),
+                    "student_answer": question.get("student_answer"),
+                }
+            )
+        payload = {
+            "graded_questions": items,
+            "rubric": ctx.state.get("rubric"),
+            "student_id": ctx.state.get("student_id"),
+            "exam_id": ctx.state.get("exam_id"),
+        }
+        return f"{REFEREE_PROMPT}\n\nINPUT:\n{json.dumps(payload, ensure_ascii=False)}"
+
+    return instruction
+
+
+class RefereeBatchAgent(BaseAgent):
+    """Runs one referee batch (``sub_agents[0]``), dropping a report that fails validation.
+
+    ADK validates ``output_schema`` while saving the reply and raises on a mismatch.
+    One bad batch is logged and skipped, leaving its grades unrefereed, instead of
+    aborting the whole grading run.
+    """
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        referee = self.sub_agents[0]
+        try:
+            async for event in referee.run_async(ctx):
+                yield event
+        except pydantic.ValidationError as e:
+            logger.error(
+                "%s returned an invalid report, skipping it: %s", referee.name, e
+            )
+
+
+def create_referee_agent(
+    batch: int, graded: list[dict[str, typing.Any]]
+) -> RefereeBatchAgent:
+    return RefereeBatchAgent(
+        name=f"RefereeBatch_{batch}",
+        sub_agents=[
+            Agent(
+                name=f"RefereeAgent_{batch}",
+                model=_referee_model,
+                instruction=_referee_instruction(graded),
+                output_schema=RefereeReport,
+                include_contents="none",
+                before_model_callback=instruction_only,
+                output_key=f"referee_report_{batch}",
+            )
+        ],
+    )
+
+
+def apply_referee_corrections(
+    graded: list[dict[str, typing.Any]], corrected: list[dict[str, typing.Any]]
+) -> tuple[list[dict[str, typing.Any]], float]:
+    """Overwrite referee-corrected scores; return the new list and the total score delta.
+
+    Corrections are clamped to ``[0, max_score]`` of the item they apply to.
+    """
+    fixes = {
+        fix.get("question_id"): fix["corrected_score"]
+        for fix in corrected
+        if fix.get("corrected_score") is not None
+    }
+    reconciled, delta = [], 0.0
+    for item in graded:
+        score = fixes.get(item.get("question_id"))
+        if score is not None:
+            score = max(0.0, float(score))
+            if item.get("max_score") is not None:
+                score = min(score, float(item["max_score"]))
+        if score is None or score == item.get("score"):
+            reconciled.append(item)
+            continue
+        delta += float(score) - float(item.get("score") or 0)
+        reconciled.append({**item, "score": score, "original_score": item.get("score")})
+    return reconciled, delta
+
+
+def merge_referee_reports(
+    reports: list[dict[str, typing.Any]],
+) -> dict[str, typing.Any]:
+    """Combine per-batch referee reports into a single report."""
+    return {
+        "ok": all(report.get("ok", True) for report in reports),
+        "issues": [issue for report in reports for issue in report.get("issues", [])],
+        "corrected": [fix for report in reports for fix in report.get("corrected", [])],
+        "status": (
+            "PENDING_REVIEW"
+            if any(report.get("status") == "PENDING_REVIEW" for report in reports)
+            else "COMPLETED"
+        ),
+        "low_confidence_count": sum(
+            int(report.get("low_confidence_count") or 0) for report in reports
+        ),
+    }
+
+
+class StreamingRefereeAgent(BaseAgent):
+    """Referees graded questions while the grader (``sub_agents[0]``) is still producing them.
+
+    Every graded question is queued as soon as it lands in state. A micro-batch is
+    sent to its own referee once it holds ``batch_size`` items or ``flush_interval``
+    seconds after its first item, so refereeing overlaps grading instead of waiting
+    for it. Batch reports are merged into ``state["referee_report"]`` and running
+    score statistics into ``state["aggregated_stats"]``.
+
+    Referee corrections are applied to ``state["graded_questions"]`` once every
+    batch has reported. An optional ``speculative`` agent (``sub_agents[1]``) is
+    started on the unconfirmed grades as soon as grading finishes, overlapping
+    the referee tail; it must be safe to re-run, because it runs again on the
+    corrected grades whenever the referee changes a score. An optional
+    ``after_review`` agent (``sub_agents[2]``) only ever sees corrected grades.
+    """
+
+    agent_factory: Callable[[int, list[dict[str, typing.Any]]], BaseAgent]
+    batch_size: int = 5
+    flush_interval: float = 0.2
+    max_concurrency: int = 4
+
+    @property
+    def grader(self) -> ParallelLoopAgent:
+        return typing.cast(ParallelLoopAgent, self.sub_agents[0])
+
+    @property
+    def speculative(self) -> BaseAgent | None:
+        return self.sub_agents[1] if len(self.sub_agents) > 1 else None
+
+    @property
+    def after_review(self) -> BaseAgent | None:
+        return self.sub_agents[2] if len(self.sub_agents) > 2 else None
+
+    async def _run_child(
+        self, agent: BaseAgent, ctx: InvocationContext, label: str | None = None
+    ) -> AsyncGenerator[Event, None]:
+        async for event in agent.run_async(_branch_context(self, agent, ctx, label)):
+            yield event
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        loop = asyncio.get_running_loop()
+        runs = ConcurrentRuns(self, ctx)
+        referee_slots = asyncio.Semaphore(self.max_concurrency)
+        runs.submit(self.grader)
+
+        batch: list[dict[str, typing.Any]] = []
+        batch_started = 0.0
+        batches = 0
+        speculating = False
+        count, total_score = 0, 0.0
+        low_confidence: list[tuple[int, typing.Any]] = []
+
+        async for event in runs.events(idle_timeout=self.flush_interval):
+            if event is not None:
+                for key, raw in event.actions.state_delta.items():
+                    index = self.grader.item_index(key)
+                    if index is None:
+                        continue
+                    try:
+                        item = _load_json(raw)
+                    except json.JSONDecodeError:
+                        continue  # GradingAgent raises on invalid output once it finishes.
+                    if not batch:
+                        batch_started = loop.time()
+                    batch.append(item)
+                    count += 1
+                    total_score += float(item.get("score") or 0)
+                    if (
+                        float(item.get("model_confidence", 1.0))
+                        < LOW_CONFIDENCE_THRESHOLD
+                    ):
+                        low_confidence.append((index, item.get("question_id")))
+                yield event
+
+            grading_done = self.grader.name in runs.finished
+            if grading_done and not speculating and self.speculative is not None:
+                logger.info(
+                    "%s: starting %s on unconfirmed grades",
+                    self.name,
+                    self.speculative.name,
+                )
+                runs.submit(self.speculative)
+                speculating = True
+            if batch and (
+                grading_done
+                or len(batch) >= self.batch_size
+                or loop.time() - batch_started >= self.flush_interval
+            ):
+                runs.submit(self.agent_factory(batches, batch), referee_slots)
+                batches += 1
+                batch = []
+
+        reports = []
+        for number in range(batches):
+            raw = ctx.session.state.get(f"referee_report_{number}")
+            if not raw:
+                logger.warning("RefereeAgent_%d returned no report", number)
+                continue
+            try:
+                reports.append(_load_json(raw))
+            except json.JSONDecodeError as e:
+                logger.error("Error parsing referee_report_%d: %s", number, e)
+
+        report = merge_referee_reports(reports)
+        graded, delta = apply_referee_corrections(
+            ctx.session.state.get("graded_questions") or [], report["corrected"]
+        )
+        changed = sum("original_score" in item for item in graded)
+        if changed:
+            total_score += delta
+            logger.info(
+                "%s: referee corrected %d scores (total score %+g)",
+                self.name,
+                changed,
+                delta,
+            )
+
+        aggregated_stats = {
+            "count": count,
+            "total_score": total_score,
+            "avg_score": total_score / count if count else 0.0,
+            "low_confidence_items": [qid for _, qid in sorted(low_confidence)],
+        }
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(
+                state_delta={
+                    "graded_questions": graded,
+                    "referee_report": json.dumps(report),
+                    "aggregated_stats": aggregated_stats,
+                }
+            ),
+        )
+
+        if changed and speculating and self.speculative is not None:
+            # The speculative run saw the overturned scores; redo it on the corrected
+            # ones, in a fresh branch so it doesn't pick up its first attempt.
+            logger.info(
+                "%s: re-running %s on corrected grades",
+                self.name,
+                self.speculative.name,
+            )
+            async for event in self._run_child(
+                self.speculative, ctx, f"{self.speculative.name}_corrected"
+            ):
+                yield event
+        if self.after_review is not None:
+            async for event in self._run_child(self.after_review, ctx):
+                yield event
+
+
+referee_agent = StreamingRefereeAgent(
     name="RefereeAgent",
-    model=Gemini(model="gemini-2.5-flash", retry_options=retry_config),
-    instruction=REFEREE_PROMPT,
-    tools=[mongo_mcp_toolset],
-    output_key="referee_report",
+    # WeaknessDetection's write is a $set on the student, so re-running it is safe;
+    # SmartPrep inserts a practice session, so it waits for corrected grades.
+    sub_agents=[
+        grading_agent,
+        create_weakness_detection_agent(),
+        create_smart_prep_agent(),
+    ],
+    agent_factory=create_referee_agent,
+    batch_size=5,
+    flush_interval=0.2,
+    max_concurrency=4,
     after_agent_callback=referee_after_callback,
 )
 
 final_aggregator = Agent(
     name="FinalAggregator",
-    model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+    model=SharedClientGemini(model="gemini-2.5-flash-lite"),
     instruction=FINAL_AGGREGATOR_PROMPT,
     tools=[mongo_mcp_toolset],
+    # Every input is rendered into the instruction. At the top level (branch None)
+    # the history would otherwise carry every per-question and referee event.
+    include_contents="none",
     output_key="final_payload",
+    before_agent_callback=final_before_callback,
     after_agent_callback=final_after_callback,
 )
 
@@ -115,10 +575,7 @@ pbt_grading_pipeline: SequentialAgent = PBTGradingPipelineAgent(
     name="PBTGradingPipeline",
     sub_agents=[
         preprocessing_agent,
-        grading_agent,
         referee_agent,
-        create_weakness_detection_agent(),
-        create_smart_prep_agent(),
         final_aggregator,
     ],
 )
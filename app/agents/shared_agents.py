@@ -1,11 +1,15 @@
 import logging
 
 from google.adk.agents import Agent
-from google.adk.models.google_llm import Gemini
 
-from app.callbacks import smart_prep_after_callback, weakness_after_callback, skip_smartprep_gate
+from app.app_utils.genai_client import SharedClientGemini
+from app.callbacks import (
+    skip_smartprep_gate,
+    smart_prep_after_callback,
+    weakness_after_callback,
+)
 from app.prompts import SMART_PREP_PROMPT, WEAKNESS_PROMPT
-from app.toolsets import custom_mcp_toolset, mongo_mcp_toolset, retry_config
+from app.toolsets import custom_mcp_toolset, mongo_mcp_toolset
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +17,7 @@ logger = logging.getLogger(__name__)
 def create_weakness_detection_agent() -> Agent:
     return Agent(
         name="WeaknessDetectionAgent",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=SharedClientGemini(model="gemini-2.5-flash-lite"),
         instruction=WEAKNESS_PROMPT,
         tools=[mongo_mcp_toolset],
         output_key="weakness_profile_raw",
@@ -24,7 +28,7 @@ def create_weakness_detection_agent() -> Agent:
 def create_smart_prep_agent() -> Agent:
     return Agent(
         name="SmartPrepAgent",
-        model=Gemini(model="gemini-2.5-flash-lite", retry_options=retry_config),
+        model=SharedClientGemini(model="gemini-2.5-flash-lite"),
         instruction=SMART_PREP_PROMPT,
         tools=[custom_mcp_toolset, mongo_mcp_toolset],
         output_key="practice_sessions_created_raw",
@@ -0,0 +1,110 @@
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from collections import OrderedDict
+from functools import cache
+
+import numpy as np
+from google.genai import types
+
+from app.app_utils.genai_client import genai_client
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = "text-embedding-004"
+CACHE_DB_PATH = os.environ.get(
+    "GRADR_CACHE_DB", os.path.join(tempfile.gettempdir(), "gradr_cache.db")
+)
+SIMILARITY_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", 0.9))
+# Misses whose summary never arrives (e.g. the summarizer failed) must not pile up.
+MAX_PENDING_EMBEDDINGS = 256
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.casefold().split())
+
+
+class AnswerCache:
+    """Semantic cache of SummarizerAgent output, keyed by question embedding.
+
+    Entries live in sqlite so they survive restarts; embeddings are also held in
+    memory as a unit-normalised matrix so lookup is a single matrix-vector product.
+    """
+
+    def __init__(self, path: str = CACHE_DB_PATH) -> None:
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answer_cache("
+            "question TEXT PRIMARY KEY, embedding BLOB, summary TEXT, ts REAL)"
+        )
+        rows = self._db.execute(
+            "SELECT question, embedding, summary FROM answer_cache"
+        ).fetchall()
+        self._questions = [row[0] for row in rows]
+        self._summaries = [row[2] for row in rows]
+        self._exact = dict(zip(self._questions, self._summaries, strict=True))
+        self._matrix = (
+            np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+            if rows
+            else np.empty((0, 0), dtype=np.float32)
+        )
+        # Embeddings computed by lookup() and reused by store() for the same question.
+        self._pending: OrderedDict[str, np.ndarray] = OrderedDict()
+
+    async def _embed(self, question: str) -> np.ndarray:
+        response = await genai_client().aio.models.embed_content(
+            model=EMBEDDING_MODEL,
+            contents=question,
+            config=types.EmbedContentConfig(task_type="SEMANTIC_SIMILARITY"),
+        )
+        vector = np.asarray(response.embeddings[0].values, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    async def lookup(
+        self, question: str, threshold: float = SIMILARITY_THRESHOLD
+    ) -> str | None:
+        """Return the cached summary of the nearest question with cosine >= threshold."""
+        key = normalize_question(question)
+        if key in self._exact:
+            return self._exact[key]
+        vector = await self._embed(key)
+        scores = self._matrix @ vector if len(self._matrix) else None
+        best = int(np.argmax(scores)) if scores is not None else -1
+        if scores is None or scores[best] < threshold:
+            self._pending[key] = vector
+            if len(self._pending) > MAX_PENDING_EMBEDDINGS:
+                self._pending.popitem(last=False)
+            return None
+        logger.info(
+            "Answer cache hit (cosine %.3f) for '%s' via '%s'",
+            scores[best],
+            key,
+            self._questions[best],
+        )
+        return self._summaries[best]
+
+    async def store(self, question: str, summary: str) -> None:
+        key = normalize_question(question)
+        if key in self._exact:
+            return
+        vector = self._pending.pop(key, None)
+        if vector is None:
+            vector = await self._embed(key)
+        self._db.execute(
+            "INSERT OR REPLACE INTO answer_cache VALUES (?, ?, ?, ?)",
+            (key, vector.tobytes(), summary, time.time()),
+        )
+        self._db.commit()
+        self._questions.append(key)
+        self._summaries.append(summary)
+        self._exact[key] = summary
+        self._matrix = (
+            np.vstack([self._matrix, vector]) if len(self._matrix) else vector[None, :]
+        )
+
+
+@cache
+def answer_cache() -> AnswerCache:
+    return AnswerCache()
@@ -0,0 +1,55 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import hashlib
+import threading
+from collections.abc import Iterator
+
+
+class InflightCoalescer:
+    """Lets concurrent callers doing identical work wait on the first one's result.
+
+    Unlike the answer cache this is exact-match and memory-resident: an entry only
+    lives while its leader is running, which is what absorbs a thundering herd of
+    identical requests before anything has been cached.
+
+    Entries are thread-safe futures, so callers on different event loops (ADK's
+    sync ``Runner.run`` drives each request on its own thread and loop) can still
+    wait on each other.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        return hashlib.blake2b("\x00".join(parts).encode(), digest_size=16).hexdigest()
+
+    def pending(self, key: str) -> asyncio.Future | None:
+        """Future for an in-flight leader of ``key``, bound to the running loop.
+
+        Await it with asyncio.shield so a cancelled waiter doesn't cancel the leader.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+        return asyncio.wrap_future(future) if future is not None else None
+
+    @contextlib.contextmanager
+    def lead(self, key: str) -> Iterator[concurrent.futures.Future]:
+        """Register the caller as leader for ``key``; it must set the future's result.
+
+        If the leader exits without a result, waiters receive ``None`` and should
+        do the work themselves.
+        """
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            self._inflight[key] = future
+        try:
+            yield future
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+            if not future.done():
+                future.set_result(None)
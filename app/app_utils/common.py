@@ -1,5 +1,6 @@
 import json
 import logging
+import typing
 from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
@@ -35,6 +36,13 @@ def _clean_json(raw: str) -> str:
     return s.strip()
 
 
+def _load_json(raw: typing.Any) -> typing.Any:
+    """Parse an agent output from state: output_schema agents store dicts, others JSON text."""
+    if isinstance(raw, (dict, list)):
+        return raw
+    return json.loads(_clean_json(raw))
+
+
 def _log_agent_complete(agent_name: str, output_key: str) -> None:
     """Emit a structured log entry for agent completion."""
     logger.info(
@@ -0,0 +1,32 @@
+from functools import cache, cached_property
+
+from google import genai
+from google.adk.models.google_llm import Gemini
+from google.genai import types
+
+from app.toolsets import retry_config
+
+
+@cache
+def genai_client() -> genai.Client:
+    """Return the process-wide genai Client.
+
+    The client owns the underlying HTTP session (and its keep-alive pool), so
+    sharing one instance avoids a fresh TLS handshake and client construction for
+    every call. Use ``genai_client().aio`` from async code so calls never block
+    the event loop.
+    """
+    return genai.Client(http_options=types.HttpOptions(retry_options=retry_config))
+
+
+class SharedClientGemini(Gemini):
+    """ADK Gemini model that sends its requests through ``genai_client()``.
+
+    Stock ``Gemini`` builds a Client (and connection pool) per instance. Retries
+    come from the shared client's ``retry_config``; ADK re-attaches its tracking
+    headers on every request, so nothing is lost by sharing.
+    """
+
+    @cached_property
+    def api_client(self) -> genai.Client:
+        return genai_client()
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+import typing
+from functools import cache
+
+from app.app_utils.answer_cache import CACHE_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# Tool name -> time-to-live in seconds (None = never expires).
+CACHEABLE_TOOLS: dict[str, float | None] = {
+    # Deterministic in its arguments, and the guide text is one of them, so the
+    # key is already a content hash.
+    "parse_marking_guide": None,
+    # read_object is deliberately absent: it is keyed only by bucket and name, so
+    # a guide re-uploaded under the same name would be served stale. Cache it once
+    # the key can include the object's generation.
+}
+
+
+def tool_cache_key(tool_name: str, args: dict[str, typing.Any]) -> str:
+    payload = json.dumps([tool_name, args], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ToolResultCache:
+    """sqlite cache of MCP tool responses keyed by SHA-256 of name + arguments."""
+
+    def __init__(self, path: str = CACHE_DB_PATH) -> None:
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache("
+            "sha256 TEXT PRIMARY KEY, tool TEXT, response TEXT, ts REAL)"
+        )
+
+    def get(self, tool_name: str, args: dict[str, typing.Any]) -> dict | None:
+        if tool_name not in CACHEABLE_TOOLS:
+            return None
+        row = self._db.execute(
+            "SELECT response, ts FROM tool_cache WHERE sha256 = ?",
+            (tool_cache_key(tool_name, args),),
+        ).fetchone()
+        if row is None:
+            return None
+        ttl = CACHEABLE_TOOLS[tool_name]
+        if ttl is not None and time.time() - row[1] > ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(
+        self,
+        tool_name: str,
+        args: dict[str, typing.Any],
+        response: typing.Any,
+        refresh: bool = False,
+    ) -> None:
+        """Store ``response``; ``refresh`` replaces an unexpired row as well."""
+        if tool_name not in CACHEABLE_TOOLS:
+            return
+        # MCP tools report failures in-band; never pin an error.
+        if (
+            not isinstance(response, dict)
+            or response.get("isError")
+            or response.get("error")
+        ):
+            return
+        now = time.time()
+        for name, ttl in CACHEABLE_TOOLS.items():
+            if ttl is not None:
+                self._db.execute(
+                    "DELETE FROM tool_cache WHERE tool = ? AND ts < ?",
+                    (name, now - ttl),
+                )
+        # ADK runs after_tool_callback on cache hits too, so unless asked to refresh
+        # only overwrite rows that have expired; otherwise a hit would keep
+        # extending its own TTL.
+        ttl = CACHEABLE_TOOLS[tool_name]
+        if refresh:
+            cutoff = float("inf")
+        else:
+            cutoff = now - ttl if ttl is not None else float("-inf")
+        self._db.execute(
+            "INSERT INTO tool_cache VALUES (?, ?, ?, ?) ON CONFLICT(sha256) DO UPDATE "
+            "SET response = excluded.response, ts = excluded.ts WHERE tool_cache.ts < ?",
+            (
+                tool_cache_key(tool_name, args),
+                tool_name,
+                json.dumps(response),
+                now,
+                cutoff,
+            ),
+        )
+        self._db.commit()
+
+
+@cache
+def tool_cache() -> ToolResultCache:
+    return ToolResultCache()
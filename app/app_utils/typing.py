@@ -31,3 +31,44 @@ class Feedback(BaseModel):
     service_name: Literal["gradr-agent"] = "gradr-agent"
     user_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     session_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+
+
+class Summary(BaseModel):
+    """SummarizerAgent output: consensus over the OnlineAnswersAgent results."""
+
+    consensus_answer: str = Field(description="one-line answer")
+    bullets: list[str] = Field(description="3-5 of the most reliable points")
+    confidence: float = Field(ge=0.0, le=1.0)
+    sources: list[str]
+
+
+class GradedQuestion(BaseModel):
+    """QuestionGrader output for a single question."""
+
+    question_id: str
+    score: float = Field(ge=0.0, description="0 to max_score")
+    max_score: float = Field(ge=0.0)
+    rubric_alignment: list[str] = Field(description="rubric criteria met")
+    justification: str = Field(description="1-3 sentences citing rubric points")
+    model_confidence: float = Field(ge=0.0, le=1.0)
+    feedback: str = Field(description="constructive student feedback")
+
+
+class RefereeIssue(BaseModel):
+    question_id: str
+    issue: str
+
+
+class RefereeCorrection(BaseModel):
+    question_id: str
+    corrected_score: float = Field(ge=0.0, description="0 to the item's max_score")
+
+
+class RefereeReport(BaseModel):
+    """RefereeAgent output for one micro-batch of graded questions."""
+
+    ok: bool
+    issues: list[RefereeIssue]
+    corrected: list[RefereeCorrection]
+    status: Literal["COMPLETED", "PENDING_REVIEW"]
+    low_confidence_count: int = Field(ge=0)
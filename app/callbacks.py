@@ -1,13 +1,48 @@
 import json
 import logging
+import os
+import re
 import typing
 
 from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types as genai_types
 
-from app.app_utils.common import _clean_json, _log_agent_complete
+from app.app_utils.answer_cache import answer_cache
+from app.app_utils.common import _clean_json, _load_json, _log_agent_complete
+from app.app_utils.tool_cache import tool_cache
 
 logger = logging.getLogger(__name__)
 
+# Canned outputs for before-agent callbacks that short-circuit an LLM agent.
+_SKIPPED_JSON = '{"skipped": true}'
+_CACHE_HIT_JSON = '{"skipped": true, "reason": "answer cache hit"}'
+_NON_ALOC_JSON = '{"skipped": true, "reason": "non-ALOC exam type"}'
+_UNLINKED_JSON = '{"skipped": true, "reason": "unlinked student"}'
+_NO_ESSAYS_JSON = '{"essay_results": []}'
+_RUBRIC_COVERED_JSON = '{"skipped": true, "reason": "rubric covers answer"}'
+
+# Jaccard overlap between answer and rubric tokens below which web evidence is fetched.
+EVIDENCE_OVERLAP_THRESHOLD = float(os.environ.get("EVIDENCE_OVERLAP_THRESHOLD", 0.2))
+
+
+def _skip_content(text: str) -> genai_types.Content:
+    """Content returned from a before-agent callback so ADK skips the agent."""
+    return genai_types.Content(parts=[genai_types.Part(text=text)])
+
+
+def instruction_only(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> None:
+    """Send only the instruction, for agents whose inputs are all rendered into it.
+
+    ``include_contents="none"`` still carries over the latest reply of another
+    agent, which for the first agent of each question chain is PreprocessingAgent's
+    entire context.
+    """
+    llm_request.contents = []
+    return None
+
 
 def preprocessing_after_callback(callback_context: CallbackContext) -> None:
     raw_context = callback_context.state.get("preprocessing_context")
@@ -46,22 +81,14 @@ def preprocessing_after_callback(callback_context: CallbackContext) -> None:
 
 
 def grading_after_callback(callback_context: CallbackContext) -> None:
-    raw_res = callback_context.state.get("graded_result")
-    if not raw_res:
-        logger.error("GradingAgent returned no output. Aborting pipeline.")
-        raise ValueError("CRITICAL: GradingAgent produced no graded result.")
-    try:
-        data = json.loads(_clean_json(raw_res))
-        graded = data.get("graded_questions", [])
-        if not graded:
-            logger.error("GradingAgent returned empty graded_questions. Aborting pipeline.")
-            raise ValueError("CRITICAL: GradingAgent produced zero graded questions.")
-        callback_context.state["graded_questions"] = graded
-        logger.info("GradingAgent: Successfully evaluated answers against the rubric. Handing off to RefereeAgent...")
-        _log_agent_complete("GradingAgent", "graded_result")
-    except json.JSONDecodeError as e:
-        logger.error("CRITICAL: Failed to parse grading result: %s", e, exc_info=True)
-        raise ValueError(f"CRITICAL: GradingAgent output is not valid JSON: {e}") from e
+    graded = callback_context.state.get("graded_questions")
+    if not graded:
+        logger.error("GradingAgent returned empty graded_questions. Aborting pipeline.")
+        raise ValueError("CRITICAL: GradingAgent produced zero graded questions.")
+    logger.info(
+        "GradingAgent: Successfully evaluated answers against the rubric. Handing off to RefereeAgent..."
+    )
+    _log_agent_complete("GradingAgent", "graded_questions")
 
 
 def referee_after_callback(callback_context: CallbackContext) -> None:
@@ -82,10 +109,240 @@ def referee_after_callback(callback_context: CallbackContext) -> None:
         callback_context.state["referee_status"] = "COMPLETED"
 
 
+def _format_number(value: typing.Any) -> str:
+    return f"{value:g}" if isinstance(value, (int, float)) else str(value)
+
+
+def final_before_callback(callback_context: CallbackContext) -> None:
+    """Precompute FinalAggregator's numeric fields so the LLM copies instead of computing."""
+    graded = callback_context.state.get("graded_questions") or []
+    stats = callback_context.state.get("aggregated_stats") or {}
+    total = stats.get("total_score")
+    if total is None:
+        total = sum(float(item.get("score") or 0) for item in graded)
+    max_score = callback_context.state.get("max_score")
+    if max_score is None:
+        max_score = (callback_context.state.get("rubric") or {}).get("max_score")
+    if (
+        max_score is None
+        and graded
+        and all(item.get("max_score") is not None for item in graded)
+    ):
+        max_score = sum(float(item["max_score"]) for item in graded)
+    if max_score is None:
+        logger.error(
+            "FinalAggregator: no max_score in state, rubric or graded questions."
+        )
+        raise ValueError(
+            "CRITICAL: Cannot build the score summary without a max_score."
+        )
+    callback_context.state["score_summary"] = (
+        f"{_format_number(total)}/{_format_number(max_score)}"
+    )
+    callback_context.state["result_items"] = json.dumps(
+        [
+            {
+                "questionId": item.get("question_id"),
+                "score": item.get("score"),
+                "maxScore": item.get("max_score"),
+                "explanation": item.get("justification"),
+                "feedback": item.get("feedback"),
+            }
+            for item in graded
+        ],
+        ensure_ascii=False,
+    )
+    return None
+
+
 def final_after_callback(callback_context: CallbackContext) -> None:
     _log_agent_complete("FinalAggregator", "final_payload")
 
 
+def _question_text(callback_context: CallbackContext, index: int) -> str:
+    questions = callback_context.state.get("questions") or []
+    if index >= len(questions):
+        return ""
+    return str(questions[index].get("question", ""))
+
+
+def _tokens(text: str) -> set[str]:
+    return set(re.findall(r"\w+", text.casefold()))
+
+
+def _strings(value: typing.Any) -> typing.Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+def _rubric_text(rubric: typing.Any, question_id: typing.Any) -> str:
+    """Text of the rubric items for ``question_id``, or of every item if none are tagged."""
+    if isinstance(rubric, str):
+        try:
+            rubric = _load_json(rubric)
+        except json.JSONDecodeError:
+            return rubric
+    items = rubric.get("rubric_items", rubric) if isinstance(rubric, dict) else rubric
+    if not isinstance(items, list):
+        return " ".join(_strings(items))
+    matched = [
+        item
+        for item in items
+        if isinstance(item, dict)
+        and question_id is not None
+        and str(item.get("question_id", item.get("questionId"))) == str(question_id)
+    ]
+    return " ".join(_strings(matched or items))
+
+
+def needs_external_evidence(
+    student_answer: str, rubric: typing.Any, question_id: typing.Any = None
+) -> bool:
+    """Whether the rubric alone is too far from the answer to grade it confidently."""
+    answer = _tokens(student_answer)
+    if not answer:
+        # Nothing to corroborate; the rubric is enough to award zero.
+        return False
+    reference = _tokens(_rubric_text(rubric, question_id))
+    if not reference:
+        return True
+    overlap = len(answer & reference) / len(answer | reference)
+    return overlap < EVIDENCE_OVERLAP_THRESHOLD
+
+
+def skip_retrieval_if_rubric_covers(
+    index: int,
+) -> typing.Callable[[CallbackContext], typing.Any | None]:
+    """Skip web retrieval for question <index> when its rubric already matches the answer."""
+
+    def callback(callback_context: CallbackContext) -> typing.Any | None:
+        questions = callback_context.state.get("questions") or []
+        if index >= len(questions):
+            return None
+        question = questions[index]
+        rubric = callback_context.state.get("rubric")
+        if not rubric or needs_external_evidence(
+            str(question.get("student_answer") or ""),
+            rubric,
+            question.get("question_id"),
+        ):
+            return None
+        # Don't let the grader fall back to a summary left by an earlier run.
+        callback_context.state[f"final_summary_{index}"] = None
+        logger.info("Retrieval_%d skipped: rubric covers the answer", index)
+        return _skip_content(_RUBRIC_COVERED_JSON)
+
+    return callback
+
+
+def answer_cache_lookup(
+    index: int,
+) -> typing.Callable[[CallbackContext], typing.Awaitable[typing.Any | None]]:
+    """Skip OnlineAnswersAgent_<index> when a near-identical question was already summarised."""
+
+    async def callback(callback_context: CallbackContext) -> typing.Any | None:
+        # Reset any hit left by an earlier run in this session, so a miss now
+        # still runs the summarizer and refreshes final_summary_<index>.
+        callback_context.state[f"answer_cache_hit_{index}"] = False
+        question = _question_text(callback_context, index)
+        if not question:
+            return None
+        try:
+            summary = await answer_cache().lookup(question)
+        except Exception as e:
+            logger.warning("Answer cache lookup failed, running retrieval: %s", e)
+            return None
+        if summary is None:
+            return None
+        try:
+            # Match the dict SummarizerAgent's output_schema would have stored.
+            summary = _load_json(summary)
+        except json.JSONDecodeError:
+            pass
+        callback_context.state[f"final_summary_{index}"] = summary
+        callback_context.state[f"answer_cache_hit_{index}"] = True
+        logger.info("OnlineAnswersAgent_%d skipped: answer cache hit", index)
+        return _skip_content(_CACHE_HIT_JSON)
+
+    return callback
+
+
+def skip_summary_on_cache_hit(
+    index: int,
+) -> typing.Callable[[CallbackContext], typing.Any | None]:
+    def callback(callback_context: CallbackContext) -> typing.Any | None:
+        if not callback_context.state.get(f"answer_cache_hit_{index}"):
+            return None
+        return _skip_content(_CACHE_HIT_JSON)
+
+    return callback
+
+
+def answer_cache_store(
+    index: int,
+) -> typing.Callable[[CallbackContext], typing.Awaitable[None]]:
+    """Cache SummarizerAgent_<index> output for later lookups of the same question."""
+
+    async def callback(callback_context: CallbackContext) -> None:
+        if callback_context.state.get(f"answer_cache_hit_{index}"):
+            return
+        raw = callback_context.state.get(f"final_summary_{index}")
+        question = _question_text(callback_context, index)
+        if not raw or not question:
+            return
+        try:
+            summary = (
+                _clean_json(raw)
+                if isinstance(raw, str)
+                else json.dumps(raw, ensure_ascii=False)
+            )
+            await answer_cache().store(question, summary)
+        except Exception as e:
+            logger.warning("Failed to cache summary for question %d: %s", index, e)
+
+    return callback
+
+
+def tool_cache_lookup(
+    tool: typing.Any, args: dict[str, typing.Any], tool_context: typing.Any
+) -> dict | None:
+    """Answer cacheable tool calls (see tool_cache.CACHEABLE_TOOLS) without running them.
+
+    Every call of a forced regrade bypasses the cache.
+    """
+    if tool_context.state.get("force_regrade"):
+        return None
+    try:
+        cached = tool_cache().get(tool.name, args)
+    except Exception as e:
+        logger.warning("Tool cache lookup failed for %s: %s", tool.name, e)
+        return None
+    if cached is not None:
+        logger.info("Tool cache hit for %s", tool.name)
+    return cached
+
+
+def tool_cache_store(
+    tool: typing.Any,
+    args: dict[str, typing.Any],
+    tool_context: typing.Any,
+    tool_response: typing.Any,
+) -> None:
+    try:
+        # A forced regrade fetched fresh copies; let them replace what is cached.
+        refresh = bool(tool_context.state.get("force_regrade"))
+        tool_cache().put(tool.name, args, tool_response, refresh=refresh)
+    except Exception as e:
+        logger.warning("Tool cache store failed for %s: %s", tool.name, e)
+    return None
+
+
 def weakness_after_callback(callback_context: CallbackContext) -> None:
     raw_profile = callback_context.state.get("weakness_profile_raw")
     if not raw_profile:
@@ -176,6 +433,11 @@ def _get_message_payload(callback_context: CallbackContext) -> dict:
     return {}
 
 
+def _normalize_option(value: typing.Any) -> str:
+    """Canonical form of an MCQ option id/answer for comparison."""
+    return (value if isinstance(value, str) else str(value)).strip().lower()
+
+
 def deterministic_mcq_grading(callback_context: CallbackContext) -> typing.Optional[typing.Any]:
     """Deterministic MCQ grading — no LLM needed for string comparison."""
     attempt_context = callback_context.state.get("attempt_context")
@@ -195,20 +457,32 @@ def deterministic_mcq_grading(callback_context: CallbackContext) -> typing.Optio
         questions = exam.get("questions", [])
 
         mcq_results = []
+        total = total_max = 0
         for q in questions:
-            q_id = str(q.get("_id", {}).get("$oid", q.get("_id", "")))
-            correct = str(q.get("correctOptionId", q.get("correctAnswer", ""))).strip().lower()
-            student_answer = str(answers.get(q_id, "")).strip().lower()
+            raw_id = q.get("_id")
+            q_id = (
+                str(raw_id.get("$oid", raw_id))
+                if isinstance(raw_id, dict)
+                else str(raw_id or "")
+            )
+            correct_key = next(
+                (key for key in ("correctOptionId", "correctAnswer") if key in q), None
+            )
+            correct_raw = q[correct_key] if correct_key else "N/A"
+            correct = _normalize_option(correct_raw) if correct_key else ""
+            student_answer = _normalize_option(answers.get(q_id, ""))
             max_score = q.get("maxMarks", q.get("marks", 1))
 
             is_correct = student_answer == correct and student_answer != ""
             score = max_score if is_correct else 0
+            total += score
+            total_max += max_score
 
             mcq_results.append({
                 "questionId": q_id,
                 "score": score,
                 "maxScore": max_score,
-                "explanation": f"{'Correct' if is_correct else 'Incorrect'}. The correct answer is {q.get('correctOptionId', q.get('correctAnswer', 'N/A'))}.",
+                "explanation": f"{'Correct' if is_correct else 'Incorrect'}. The correct answer is {correct_raw}.",
                 "feedback": "Well done!" if is_correct else "Review this topic.",
             })
 
@@ -216,28 +490,83 @@ def deterministic_mcq_grading(callback_context: CallbackContext) -> typing.Optio
         result_json = json.dumps({"mcq_results": mcq_results})
         callback_context.state["mcq_results_raw"] = result_json
 
-        total = sum(r["score"] for r in mcq_results)
-        total_max = sum(r["maxScore"] for r in mcq_results)
         logger.info(
             "MCQ grading completed deterministically: %d/%d (no LLM call)",
             total, total_max,
         )
 
         # Return Content to skip the LLM agent
-        from google.genai import types as genai_types
-        return genai_types.Content(parts=[genai_types.Part(text=result_json)])
+        return _skip_content(result_json)
 
     except Exception as e:
         logger.error("Deterministic MCQ grading failed, falling back to LLM: %s", e, exc_info=True)
         return None  # Fall through to LLM agent as fallback
 
+
+def _results_from_state(callback_context: CallbackContext, key: str) -> list:
+    """Read e.g. 'mcq_results', falling back to '<key>_raw' when the agent was short-circuited."""
+    results = callback_context.state.get(key)
+    if results is None and (raw := callback_context.state.get(f"{key}_raw")):
+        try:
+            results = _load_json(raw).get(key)
+        except Exception as e:
+            logger.warning("Could not parse %s_raw: %s", key, e)
+    return results if isinstance(results, list) else []
+
+
+def merge_cbt_results(callback_context: CallbackContext) -> None:
+    """Merge MCQ and essay results and total them before FeedbackNarrationAgent runs.
+
+    deterministic_mcq_grading scores every exam question, essays included, so an
+    essay result replaces the MCQ entry with the same questionId instead of
+    adding a second one.
+    """
+    merged: dict[typing.Any, dict] = {}
+    for index, result in enumerate(
+        [
+            *_results_from_state(callback_context, "mcq_results"),
+            *_results_from_state(callback_context, "essay_results"),
+        ]
+    ):
+        merged[result.get("questionId") or index] = result
+    all_results = list(merged.values())
+    obtained = round(sum(float(r.get("score") or 0) for r in all_results), 2)
+    callback_context.state["all_results"] = json.dumps(all_results, ensure_ascii=False)
+    callback_context.state["obtained_score"] = obtained
+    return None
+
+
+def narration_after_callback(callback_context: CallbackContext) -> None:
+    """Store FeedbackNarrationAgent's summary with the precomputed results and score.
+
+    The model only writes the narrative fields; the numbers always come from
+    merge_cbt_results, whatever the model emitted.
+    """
+    generic_callback("grading_summary")(callback_context)
+    summary = callback_context.state.get("grading_summary")
+    try:
+        all_results = _load_json(callback_context.state.get("all_results") or "[]")
+    except json.JSONDecodeError:
+        all_results = []
+    precomputed = {
+        "allResults": all_results,
+        "obtainedScore": callback_context.state.get("obtained_score"),
+    }
+    for key, value in precomputed.items():
+        callback_context.state[key] = value
+    callback_context.state["grading_summary"] = {
+        **(summary if isinstance(summary, dict) else {}),
+        **precomputed,
+    }
+    return None
+
+
 def skip_if_extract_only(callback_context: CallbackContext) -> typing.Optional[typing.Any]:
     payload = _get_message_payload(callback_context)
     if payload.get("task") == "extract_topics_only":
         callback_context.state["skipped"] = True
         logger.info("Skipping agent because task is extract_topics_only")
-        from google.genai import types as genai_types
-        return genai_types.Content(parts=[genai_types.Part(text='{"skipped": true}')])
+        return _skip_content(_SKIPPED_JSON)
     return None
 
 def skip_if_generate_only(callback_context: CallbackContext) -> typing.Optional[typing.Any]:
@@ -245,11 +574,39 @@ def skip_if_generate_only(callback_context: CallbackContext) -> typing.Optional[
     if payload.get("task") == "generate_questions_only":
         callback_context.state["skipped"] = True
         logger.info("Skipping agent because task is generate_questions_only")
-        from google.genai import types as genai_types
-        return genai_types.Content(parts=[genai_types.Part(text='{"skipped": true}')])
+        return _skip_content(_SKIPPED_JSON)
     return None
 
 
+ESSAY_QUESTION_TYPES = {"essay", "theory"}
+
+
+def skip_essay_grading_if_none(callback_context: CallbackContext) -> typing.Any | None:
+    """Skip EssayGradingAgent's model call when every exam question is a typed non-essay."""
+    attempt_context = callback_context.state.get("attempt_context")
+    if not attempt_context:
+        return None
+    try:
+        if isinstance(attempt_context, str):
+            attempt_context = json.loads(_clean_json(attempt_context))
+        questions = attempt_context.get("exam", {}).get("questions", [])
+        question_types = {str(q.get("type") or "").strip().lower() for q in questions}
+    except Exception as e:
+        logger.warning(
+            "Essay gate could not read exam questions, running EssayGradingAgent: %s", e
+        )
+        return None
+    # Untyped questions might be essays; let the agent decide.
+    if not questions or "" in question_types or question_types & ESSAY_QUESTION_TYPES:
+        return None
+    # Mirror what generic_callback("essay_results_group") would have stored.
+    callback_context.state["essay_results_raw"] = _NO_ESSAYS_JSON
+    callback_context.state["essay_results_group"] = {"essay_results": []}
+    callback_context.state["essay_results"] = []
+    logger.info("EssayGradingAgent skipped: exam has no essay/theory questions")
+    return _skip_content(_NO_ESSAYS_JSON)
+
+
 ALOC_EXAM_TYPES = {"utme", "wassce", "post-utme", "neco"}
 
 
@@ -267,8 +624,7 @@ def skip_smartprep_if_not_aloc(callback_context: CallbackContext) -> typing.Opti
             "Weakness data persisted for teacher insights only.",
             exam_type,
         )
-        from google.genai import types as genai_types
-        return genai_types.Content(parts=[genai_types.Part(text='{"skipped": true, "reason": "non-ALOC exam type"}')])
+        return _skip_content(_NON_ALOC_JSON)
     return None
 
 
@@ -285,8 +641,7 @@ def skip_smartprep_if_unlinked(callback_context: CallbackContext) -> typing.Opti
             "SmartPrepAgent deferred: no linked_user_id. "
             "Practice session creation deferred until student links their account."
         )
-        from google.genai import types as genai_types
-        return genai_types.Content(parts=[genai_types.Part(text='{"skipped": true, "reason": "unlinked student"}')])
+        return _skip_content(_UNLINKED_JSON)
     return None
 
 
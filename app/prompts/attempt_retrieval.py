@@ -5,7 +5,8 @@ ATTEMPT_RETRIEVAL_PROMPT = (
     "1) Use MongoDB MCP find on 'examAttempts' (db: 'test') by attemptId to retrieve the ExamAttempt.\n"
     "2) If the attempt 'status' is 'graded', return early with {'skipped': true}.\n"
     "3) Use MongoDB MCP find on 'exams' (db: 'test') to retrieve the associated Exam using the 'examId' from the attempt.\n"
-    "4) Use MongoDB MCP find on 'results' (db: 'test') by 'studentId' (from the attempt) to retrieve historical results.\n\n"
+    "4) Use MongoDB MCP find on 'results' (db: 'test') by 'studentId' (from the attempt) to retrieve historical results.\n"
+    "Steps 3 and 4 are independent: issue both finds together as parallel function calls in a single turn.\n\n"
     "OUTPUT SCHEMA (strict JSON):\n"
     "{\n"
     '  "skipped": boolean,\n'
@@ -4,8 +4,8 @@ FEEDBACK_NARRATION_PROMPT = (
     "</role>\n\n"
     "INPUT from state: 'mcq_results', 'essay_results', 'attempt_context'\n\n"
     "<cognitive_tasks>\n"
-    "1) MERGE: Combine mcq_results and essay_results into a single 'allResults' array.\n"
-    "2) COMPUTE: Calculate 'obtainedScore' (sum of all question scores, rounded to 2 decimal places).\n"
+    "1) RESULTS: The precomputed 'all_results' below are the merged MCQ and essay results. Do NOT repeat them in your output.\n"
+    "2) SCORE: The precomputed 'obtained_score' below is the final total. Do NOT recompute or repeat it.\n"
     "3) SYNTHESIZE EXPLANATION: Generate the 'overallExplanation'. Formulate a structural, clinical justification of the total score.\n"
     "   - Diagnostically isolate the academic domains where the student excelled and pinpoint specific conceptual failures that eroded their final score.\n"
     "   - Rely strictly on exact question patterns, completely avoiding generic commentary.\n"
@@ -15,10 +15,11 @@ FEEDBACK_NARRATION_PROMPT = (
     "</cognitive_tasks>\n\n"
     "OUTPUT SCHEMA (strict JSON):\n"
     "{\n"
-    '  "allResults": [...],\n'
-    '  "obtainedScore": number,\n'
     '  "overallExplanation": "...",\n'
     '  "overallFeedback": "..."\n'
     "}\n\n"
-    "Return NOTHING other than the JSON object. No markdown, no preamble."
+    "Return NOTHING other than the JSON object. No markdown, no preamble.\n\n"
+    "PRECOMPUTED from state:\n"
+    "obtained_score: {obtained_score?}\n"
+    "all_results: {all_results?}"
 )
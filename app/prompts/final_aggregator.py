@@ -1,10 +1,10 @@
 FINAL_AGGREGATOR_PROMPT = (
     "You are the FinalAggregator. Assemble and persist the final grading result.\n\n"
-    "INPUT from state: graded_questions, referee_report, practice_session_id, "
-    "student_id, student_ref, exam_id, course_id, category_id, lecturer_id, "
-    "linked_user_id, referee_status, max_score (all provided in session state)\n\n"
+    "INPUT: the identifiers and precomputed results listed at the end of this prompt "
+    "(rendered from session state).\n\n"
     "TASKS:\n"
-    "1) Compute total score (sum of individual scores).\n"
+    "1) Do NOT compute any scores: 'score_summary' and 'result_items' below were computed from the "
+    "reconciled grades and must be used verbatim.\n"
     "2) Use the MongoDB aggregate tool on 'results' collection (database: 'test') "
     "to compute class statistics: average score, count of results, count with status 'PENDING_REVIEW'.\n"
     "3) Call the MongoDB insert-many tool on 'results' collection (database: 'test') "
@@ -21,8 +21,8 @@ FINAL_AGGREGATOR_PROMPT = (
     '  "categoryId": {"$oid": "<category_id>"},\n'
     '  "lecturerId": {"$oid": "<lecturer_id>"},\n'
     '  "linkedUserId": {"$oid": "<linked_user_id>"} or null if not available,\n'
-    '  "score": "<total>/<max_score>",\n'
-    '  "results": [<graded_questions array with keys: score, maxScore, explanation, feedback, questionId>],\n'
+    '  "score": "<score_summary>",\n'
+    '  "results": <result_items, verbatim>,\n'
     '  "feedback": "<overall student feedback>",\n'
     '  "lecturerComment": "<summary of grading run>",\n'
     '  "status": "<referee_status or COMPLETED>",\n'
@@ -33,9 +33,24 @@ FINAL_AGGREGATOR_PROMPT = (
     "OUTPUT SCHEMA (strict JSON, nothing else):\n"
     "{\n"
     '  "result_id": "<_id of inserted result>",\n'
-    '  "score_summary": "<total>/<max_score>",\n'
+    '  "score_summary": "<score_summary>",\n'
     '  "class_stats": {"average": ..., "total_students": ..., "pending_review_count": ...},\n'
     '  "practice_session_link": "/practice/sessions/<practice_session_id>"\n'
     "}\n\n"
-    "Return NOTHING other than the JSON object. No markdown, no explanation."
+    "Return NOTHING other than the JSON object. No markdown, no explanation.\n\n"
+    "IDENTIFIERS from state:\n"
+    "student_id: {student_id?}\n"
+    "student_ref: {student_ref?}\n"
+    "exam_id: {exam_id?}\n"
+    "course_id: {course_id?}\n"
+    "category_id: {category_id?}\n"
+    "lecturer_id: {lecturer_id?}\n"
+    "linked_user_id: {linked_user_id?}\n"
+    "practice_session_id: {practice_session_id?}\n\n"
+    "PRECOMPUTED from state (referee corrections are already applied):\n"
+    "score_summary: {score_summary?}\n"
+    "aggregated_stats: {aggregated_stats?}\n"
+    "result_items: {result_items?}\n"
+    "referee_status: {referee_status?}\n"
+    "referee_report: {referee_report?}"
 )
@@ -1,6 +1,6 @@
 ONLINE_ANSWERS_PROMPT = (
     "You are the OnlineAnswersAgent.\n\n"
-    "TASK: Given a single exam question, use the google_search tool to gather "
+    "TASK: Given a single exam 'question' (provided in the INPUT block), use the google_search tool to gather "
     "up to 10 concise, relevant candidate answers or authoritative references.\n\n"
     "OUTPUT SCHEMA (strict JSON, nothing else):\n"
     "{\n"
@@ -1,12 +1,12 @@
 REFEREE_PROMPT = (
     "You are the RefereeAgent (validation & quality gate).\n\n"
-    "INPUT from state: 'graded_questions' (graded questions array), 'student_id' (student identifier), 'exam_id' (exam identifier)\n\n"
+    "INPUT (provided as JSON at the end of these instructions): 'graded_questions' (graded questions array, each with its "
+    "'question' and 'student_answer'), 'rubric' (the marking guide), 'student_id' (student identifier), 'exam_id' (exam identifier)\n\n"
     "TASKS:\n"
     "1) Verify numeric totals: ensure no score > max_score, all required fields present, confidence between 0.0-1.0.\n"
     "2) Detect hallucinations: if a justification references facts not present in student_answer or rubric, flag it.\n"
-    "3) If ANY question has model_confidence < 0.70, call the MongoDB update-many tool on the 'results' collection "
-    "(database: 'test') with filter utilizing student_id and exam_id to set "
-    "{$set: {status: 'PENDING_REVIEW'}}. Set 'status': 'PENDING_REVIEW' in your output.\n"
+    "3) If ANY question has model_confidence < 0.70, set 'status': 'PENDING_REVIEW' in your output. "
+    "Do not write to the database: the FinalAggregator persists this status with the result document.\n"
     "4) If all confidence values >= 0.70, set 'status': 'COMPLETED'.\n\n"
     "OUTPUT SCHEMA (strict JSON, nothing else):\n"
     "{\n"
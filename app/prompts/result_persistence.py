@@ -18,5 +18,7 @@ RESULT_PERSISTENCE_PROMPT = (
     '  "practiceSessionIds": ["..."],\n'
     '  "status": "..."\n'
     "}\n\n"
-    "Return NOTHING other than the JSON object."
+    "Return NOTHING other than the JSON object.\n\n"
+    "GRADING SUMMARY from state (authoritative):\n"
+    "grading_summary: {grading_summary?}"
 )
@@ -1,6 +1,7 @@
 SUMMARIZER_PROMPT = (
     "You are the SummarizerAgent.\n\n"
-    "TASK: Given OnlineAnswersAgent JSON in state key 'online_answers', produce a concise "
+    "TASK: Given the exam 'question' and the OnlineAnswersAgent JSON in 'online_answers' "
+    "(both provided in the INPUT block), produce a concise "
     "3-5 bullet summary of the most reliable points and a single-line consensus answer.\n\n"
     "OUTPUT SCHEMA (strict JSON, nothing else):\n"
     "{\n"
@@ -24,5 +24,8 @@ WEAKNESS_PROMPT = (
     '  "classWeakTopics": ["topic1", "topic2"],\n'
     '  "persisted": true\n'
     "}\n\n"
-    "Return NOTHING other than the JSON object. No markdown, no explanation."
+    "Return NOTHING other than the JSON object. No markdown, no explanation.\n\n"
+    "GRADED RESULTS from state (use whichever is present):\n"
+    "graded_questions: {graded_questions?}\n"
+    "grading_summary: {grading_summary?}"
 )
@@ -1,10 +1,14 @@
 import os
-from pathlib import Path
 
 import google.auth
-from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
+from google.adk.tools.mcp_tool.mcp_session_manager import (
+    StdioConnectionParams,
+    StreamableHTTPConnectionParams,
+)
 from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+from google.auth.transport.requests import Request
 from google.genai import types
+from google.oauth2 import id_token
 from mcp import StdioServerParameters
 
 _, project_id = google.auth.default()
@@ -18,15 +22,6 @@ if mongodb_uri:
     os.environ["MDB_MCP_CONNECTION_STRING"] = mongodb_uri
     os.environ["MONGODB_URI"] = mongodb_uri
 
-# Resolve paths relative to project root (avoid hardcoded absolute paths)
-_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
-_MCP_SERVER_PATH = str(_PROJECT_ROOT / "gradr_mcp" / "server.py")
-_MCP_PYTHON_PATH = str(_PROJECT_ROOT / "gradr_mcp" / ".venv" / "bin" / "python")
-
-from google.adk.tools.mcp_tool.mcp_session_manager import StreamableHTTPConnectionParams
-from google.auth.transport.requests import Request
-from google.oauth2 import id_token
-
 # Connect to the remote Cloud Run MCP server securely via Streamable HTTP
 _CLOUD_RUN_URL = "https://gradrmcp-943768265988.us-central1.run.app"
 
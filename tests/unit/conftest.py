@@ -0,0 +1,34 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Keep unit tests off the network.
+
+``app.toolsets`` resolves ADC and fetches a Cloud Run ID token at import time,
+and nearly every app module imports it. Import it once here with both patched so
+the unit suite collects without credentials.
+"""
+
+from unittest import mock
+
+from google.auth import credentials
+
+_default = mock.patch(
+    "google.auth.default",
+    return_value=(mock.Mock(spec=credentials.Credentials), "test-project"),
+)
+_fetch_id_token = mock.patch(
+    "google.oauth2.id_token.fetch_id_token",
+    side_effect=RuntimeError("no ID token in unit tests"),
+)
+with _default, _fetch_id_token:
+    import app.toolsets  # noqa: F401
@@ -0,0 +1,93 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Fake agents and a runner helper shared by the unit tests."""
+
+import asyncio
+import typing
+from collections.abc import AsyncGenerator, Callable
+
+from google.adk.agents import BaseAgent, InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+
+class EmitAgent(BaseAgent):
+    """Sleeps for ``delay`` seconds, then emits ``delta`` as a state delta."""
+
+    delta: dict[str, typing.Any]
+    delay: float = 0.0
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        await asyncio.sleep(self.delay)
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=self.delta),
+        )
+
+
+class RecordAgent(BaseAgent):
+    """Appends ``probe(state)`` to its own ``calls`` (pydantic copies the list passed in)."""
+
+    calls: list[typing.Any]
+    probe: Callable[[dict[str, typing.Any]], typing.Any]
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        self.calls.append(self.probe(dict(ctx.session.state)))
+        yield Event(
+            invocation_id=ctx.invocation_id, author=self.name, branch=ctx.branch
+        )
+
+
+class FailAgent(BaseAgent):
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        raise RuntimeError(f"{self.name} failed")
+        yield  # pragma: no cover
+
+
+class SimpleContext:
+    """Stand-in for CallbackContext/ToolContext: the callbacks only touch ``state``."""
+
+    def __init__(self, **state: typing.Any) -> None:
+        self.state = state
+
+
+async def run_agent(
+    agent: BaseAgent, state: dict[str, typing.Any] | None = None
+) -> tuple[dict[str, typing.Any], list[Event]]:
+    """Run ``agent`` once under InMemoryRunner; return the final state and the events."""
+    runner = InMemoryRunner(agent=agent, app_name="test")
+    session = await runner.session_service.create_session(
+        app_name="test", user_id="test_user", state=state or {}
+    )
+    events = [
+        event
+        async for event in runner.run_async(
+            user_id="test_user",
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text="go")]),
+        )
+    ]
+    session = await runner.session_service.get_session(
+        app_name="test", user_id="test_user", session_id=session.id
+    )
+    return session.state, events
@@ -0,0 +1,124 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import typing
+
+import numpy as np
+import pytest
+
+from app.app_utils import answer_cache as answer_cache_module
+from app.app_utils.answer_cache import AnswerCache
+
+_VECTORS = {
+    "what is osmosis?": [1.0, 0.0, 0.0],
+    "define osmosis.": [0.95, 0.31, 0.0],
+    "what is photosynthesis?": [0.0, 1.0, 0.0],
+    "who wrote hamlet?": [0.0, 0.0, 1.0],
+}
+
+
+class FakeEmbedder:
+    """Stands in for AnswerCache._embed with fixed unit vectors; records each call."""
+
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    async def __call__(self, question: str) -> np.ndarray:
+        self.calls.append(question)
+        vector = np.asarray(_VECTORS[question], dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+
+def _cache(
+    path: str, monkeypatch: pytest.MonkeyPatch
+) -> tuple[AnswerCache, FakeEmbedder]:
+    cache = AnswerCache(path)
+    embed = FakeEmbedder()
+    monkeypatch.setattr(cache, "_embed", embed)
+    return cache, embed
+
+
+@pytest.fixture
+def db_path(tmp_path: typing.Any) -> str:
+    return str(tmp_path / "answers.db")
+
+
+@pytest.mark.asyncio
+async def test_exact_match_skips_the_embedding(
+    db_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache, embed = _cache(db_path, monkeypatch)
+    await cache.store("What is osmosis?", "osmosis summary")
+    embed.calls.clear()
+    assert await cache.lookup("  what IS   osmosis? ") == "osmosis summary"
+    assert embed.calls == []
+
+
+@pytest.mark.asyncio
+async def test_lookup_returns_the_nearest_question_above_the_threshold(
+    db_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache, _ = _cache(db_path, monkeypatch)
+    await cache.store("What is photosynthesis?", "photosynthesis summary")
+    await cache.store("What is osmosis?", "osmosis summary")
+    # cosine("define osmosis.", "what is osmosis?") is about 0.95.
+    assert await cache.lookup("Define osmosis.") == "osmosis summary"
+    assert await cache.lookup("Define osmosis.", threshold=0.99) is None
+    assert await cache.lookup("Who wrote Hamlet?") is None
+
+
+@pytest.mark.asyncio
+async def test_a_miss_reuses_its_embedding_when_stored(
+    db_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache, embed = _cache(db_path, monkeypatch)
+    assert await cache.lookup("What is osmosis?") is None
+    await cache.store("What is osmosis?", "osmosis summary")
+    assert embed.calls == ["what is osmosis?"]
+    assert cache._pending == {}
+
+
+@pytest.mark.asyncio
+async def test_entries_are_reloaded_from_sqlite(
+    db_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cache, _ = _cache(db_path, monkeypatch)
+    await cache.store("What is osmosis?", "osmosis summary")
+    await cache.store("What is photosynthesis?", "photosynthesis summary")
+
+    reloaded, embed = _cache(db_path, monkeypatch)
+    assert await reloaded.lookup("what is photosynthesis?") == "photosynthesis summary"
+    assert embed.calls == []
+    assert await reloaded.lookup("Define osmosis.") == "osmosis summary"
+
+
+@pytest.mark.asyncio
+async def test_pending_embeddings_evict_the_oldest_miss(
+    db_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(answer_cache_module, "MAX_PENDING_EMBEDDINGS", 2)
+    cache, embed = _cache(db_path, monkeypatch)
+    for question in (
+        "What is osmosis?",
+        "What is photosynthesis?",
+        "Who wrote Hamlet?",
+    ):
+        assert await cache.lookup(question) is None
+    assert list(cache._pending) == ["what is photosynthesis?", "who wrote hamlet?"]
+
+    embed.calls.clear()
+    await cache.store("Who wrote Hamlet?", "hamlet summary")
+    await cache.store("What is osmosis?", "osmosis summary")
+    assert embed.calls == ["what is osmosis?"]
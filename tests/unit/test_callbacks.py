@@ -0,0 +1,338 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# mypy: disable-error-code="arg-type"
+import json
+import types
+import typing
+
+import pytest
+
+from app import callbacks
+from app.app_utils import tool_cache as tool_cache_module
+from app.app_utils.tool_cache import ToolResultCache
+from tests.unit.fakes import SimpleContext
+
+
+def _skipped_text(result: typing.Any) -> str:
+    assert result is not None, "expected the callback to skip the agent"
+    return result.parts[0].text
+
+
+# -- answer cache -------------------------------------------------------------
+
+
+class FakeAnswerCache:
+    def __init__(self, summary: str | None) -> None:
+        self.summary = summary
+        self.stored: list[tuple[str, str]] = []
+
+    async def lookup(self, question: str) -> str | None:
+        return self.summary
+
+    async def store(self, question: str, summary: str) -> None:
+        self.stored.append((question, summary))
+
+
+@pytest.mark.asyncio
+async def test_answer_cache_hit_skips_retrieval_and_summary(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    cache = FakeAnswerCache('{"consensus_answer": "cached"}')
+    monkeypatch.setattr(callbacks, "answer_cache", lambda: cache)
+    ctx = SimpleContext(questions=[{"question": "What is x?"}])
+
+    assert "answer cache hit" in _skipped_text(
+        await callbacks.answer_cache_lookup(0)(ctx)
+    )
+    assert ctx.state["final_summary_0"] == {"consensus_answer": "cached"}
+    assert callbacks.skip_summary_on_cache_hit(0)(ctx) is not None
+
+    await callbacks.answer_cache_store(0)(ctx)
+    assert cache.stored == []
+
+
+@pytest.mark.asyncio
+async def test_answer_cache_miss_clears_a_stale_hit(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    cache = FakeAnswerCache(None)
+    monkeypatch.setattr(callbacks, "answer_cache", lambda: cache)
+    ctx = SimpleContext(questions=[{"question": "What is x?"}], answer_cache_hit_0=True)
+
+    assert await callbacks.answer_cache_lookup(0)(ctx) is None
+    assert ctx.state["answer_cache_hit_0"] is False
+    assert callbacks.skip_summary_on_cache_hit(0)(ctx) is None
+
+    ctx.state["final_summary_0"] = {"consensus_answer": "fresh"}
+    await callbacks.answer_cache_store(0)(ctx)
+    assert cache.stored == [("What is x?", '{"consensus_answer": "fresh"}')]
+
+
+# -- tool cache ---------------------------------------------------------------
+
+
+@pytest.fixture
+def tool_cache(
+    tmp_path: typing.Any, monkeypatch: pytest.MonkeyPatch
+) -> ToolResultCache:
+    cache = ToolResultCache(str(tmp_path / "tools.db"))
+    monkeypatch.setattr(callbacks, "tool_cache", lambda: cache)
+    return cache
+
+
+def _tool(name: str) -> typing.Any:
+    return types.SimpleNamespace(name=name)
+
+
+_PARSE = _tool("parse_marking_guide")
+_GUIDE_TEXT = {"text": "Q1. Define osmosis. (4 marks)", "format": "pdf"}
+
+
+def test_tool_cache_hit(tool_cache: ToolResultCache) -> None:
+    ctx = SimpleContext()
+    assert callbacks.tool_cache_lookup(_PARSE, _GUIDE_TEXT, ctx) is None
+    callbacks.tool_cache_store(_PARSE, _GUIDE_TEXT, ctx, {"rubric": ["r1"]})
+    reordered = dict(reversed(_GUIDE_TEXT.items()))
+    assert callbacks.tool_cache_lookup(_PARSE, reordered, ctx) == {"rubric": ["r1"]}
+
+
+def test_tool_cache_skips_errors_and_uncacheable_tools(
+    tool_cache: ToolResultCache,
+) -> None:
+    ctx = SimpleContext()
+    # read_object is keyed by bucket and name only, so a re-uploaded guide would be stale.
+    guide = {"bucket": "b", "name": "guides/g.pdf"}
+    callbacks.tool_cache_store(_tool("read_object"), guide, ctx, {"content": "guide"})
+    callbacks.tool_cache_store(_PARSE, _GUIDE_TEXT, ctx, {"isError": True})
+    callbacks.tool_cache_store(_tool("find"), {}, ctx, {"documents": []})
+    assert callbacks.tool_cache_lookup(_tool("read_object"), guide, ctx) is None
+    assert callbacks.tool_cache_lookup(_PARSE, _GUIDE_TEXT, ctx) is None
+    assert callbacks.tool_cache_lookup(_tool("find"), {}, ctx) is None
+
+
+def test_forced_regrade_bypasses_and_refreshes_the_tool_cache(
+    tool_cache: ToolResultCache,
+) -> None:
+    ctx = SimpleContext()
+    regrade = SimpleContext(force_regrade=True)
+    callbacks.tool_cache_store(_PARSE, _GUIDE_TEXT, ctx, {"rubric": ["v1"]})
+    assert callbacks.tool_cache_lookup(_PARSE, _GUIDE_TEXT, regrade) is None
+    callbacks.tool_cache_store(_PARSE, _GUIDE_TEXT, regrade, {"rubric": ["v2"]})
+    # An ordinary store (e.g. after a cache hit) doesn't overwrite a live row.
+    callbacks.tool_cache_store(_PARSE, _GUIDE_TEXT, ctx, {"rubric": ["v3"]})
+    assert callbacks.tool_cache_lookup(_PARSE, _GUIDE_TEXT, ctx) == {"rubric": ["v2"]}
+
+
+def test_expired_tool_results_are_purged(
+    tool_cache: ToolResultCache, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    ctx = SimpleContext()
+    expiring = _tool("list_objects")
+    monkeypatch.setitem(tool_cache_module.CACHEABLE_TOOLS, expiring.name, -1.0)
+    callbacks.tool_cache_store(expiring, {"bucket": "b"}, ctx, {"items": []})
+    assert callbacks.tool_cache_lookup(expiring, {"bucket": "b"}, ctx) is None
+    callbacks.tool_cache_store(_PARSE, _GUIDE_TEXT, ctx, {"rubric": []})
+    rows = tool_cache._db.execute("SELECT tool FROM tool_cache").fetchall()
+    assert rows == [("parse_marking_guide",)]
+
+
+# -- deterministic MCQ grading ------------------------------------------------
+
+
+def _mcq_results(questions: list[dict], answers: dict) -> list[dict]:
+    ctx = SimpleContext(
+        attempt_context=json.dumps(
+            {"exam": {"questions": questions}, "attempt": {"answers": answers}}
+        )
+    )
+    assert callbacks.deterministic_mcq_grading(ctx) is not None
+    return json.loads(ctx.state["mcq_results_raw"])["mcq_results"]
+
+
+def test_mcq_grading_matches_the_baseline_output() -> None:
+    results = _mcq_results(
+        [
+            {"_id": {"$oid": "a1"}, "correctOptionId": " B ", "maxMarks": 2},
+            {"_id": {"$oid": "p1"}, "correctOptionId": "c", "correctAnswer": "d"},
+            {"_id": {"$oid": "n1"}, "correctOptionId": None},
+            {"_id": {"$oid": "m1"}},
+            {"_id": {"$oid": "k1"}, "correctAnswer": "Paris", "marks": 3},
+        ],
+        {"a1": "b", "p1": "D", "n1": "x", "m1": "", "k1": "  PARIS "},
+    )
+    assert [(r["questionId"], r["score"], r["maxScore"]) for r in results] == [
+        ("a1", 2, 2),
+        ("p1", 0, 1),
+        ("n1", 0, 1),
+        ("m1", 0, 1),
+        ("k1", 3, 3),
+    ]
+    assert [r["explanation"] for r in results] == [
+        "Correct. The correct answer is  B .",
+        "Incorrect. The correct answer is c.",
+        "Incorrect. The correct answer is None.",
+        "Incorrect. The correct answer is N/A.",
+        "Correct. The correct answer is Paris.",
+    ]
+    assert results[0]["feedback"] == "Well done!"
+    assert results[1]["feedback"] == "Review this topic."
+
+
+def test_mcq_grading_accepts_a_plain_string_id() -> None:
+    # The baseline raised on a string _id and fell back to the LLM grader.
+    [result] = _mcq_results([{"_id": "s1", "correctOptionId": "a"}], {"s1": "A"})
+    assert (result["questionId"], result["score"]) == ("s1", 1)
+
+
+# -- EssayGradingAgent gate ---------------------------------------------------
+
+
+def _attempt(*question_types: str | None) -> str:
+    return json.dumps({"exam": {"questions": [{"type": t} for t in question_types]}})
+
+
+def test_essay_grading_skipped_when_every_question_is_a_typed_non_essay() -> None:
+    ctx = SimpleContext(attempt_context=_attempt("multiple-choice", " MCQ"))
+    assert json.loads(_skipped_text(callbacks.skip_essay_grading_if_none(ctx))) == {
+        "essay_results": []
+    }
+    assert ctx.state["essay_results"] == []
+    assert ctx.state["essay_results_group"] == {"essay_results": []}
+
+
+@pytest.mark.parametrize(
+    "attempt_context",
+    [
+        _attempt("multiple-choice", "Essay"),
+        _attempt("multiple-choice", "theory"),
+        _attempt("multiple-choice", None),
+        _attempt(),
+        "not json",
+        None,
+    ],
+)
+def test_essay_grading_runs_when_essays_are_possible(
+    attempt_context: str | None,
+) -> None:
+    assert (
+        callbacks.skip_essay_grading_if_none(
+            SimpleContext(attempt_context=attempt_context)
+        )
+        is None
+    )
+
+
+# -- precomputed scores -------------------------------------------------------
+
+
+def test_final_before_callback_precomputes_score_summary() -> None:
+    ctx = SimpleContext(
+        graded_questions=[{"question_id": "q1", "score": 1.5, "max_score": 4}],
+        aggregated_stats={"total_score": 1.5},
+        rubric={"max_score": 10.0},
+    )
+    callbacks.final_before_callback(ctx)
+    assert ctx.state["score_summary"] == "1.5/10"
+    assert json.loads(ctx.state["result_items"])[0]["questionId"] == "q1"
+
+
+def test_final_before_callback_requires_a_max_score() -> None:
+    with pytest.raises(ValueError, match="max_score"):
+        callbacks.final_before_callback(SimpleContext(graded_questions=[{"score": 1}]))
+
+
+def test_narration_after_callback_keeps_the_precomputed_scores() -> None:
+    ctx = SimpleContext(
+        all_results=json.dumps([{"questionId": "a", "score": 2}]),
+        obtained_score=2.0,
+        grading_summary_raw='{"obtainedScore": 99, "allResults": [], "overallFeedback": "ok"}',
+    )
+    callbacks.narration_after_callback(ctx)
+    assert ctx.state["grading_summary"] == {
+        "obtainedScore": 2.0,
+        "allResults": [{"questionId": "a", "score": 2}],
+        "overallFeedback": "ok",
+    }
+    assert ctx.state["obtainedScore"] == 2.0
+
+
+def test_hybrid_exam_essay_result_replaces_the_mcq_entry() -> None:
+    attempt_context = {
+        "exam": {
+            "questions": [
+                {"_id": "m1", "type": "multiple-choice", "correctOptionId": "a"},
+                {"_id": "e1", "type": "essay", "maxMarks": 10},
+            ]
+        },
+        "attempt": {"answers": {"m1": "a", "e1": "An essay."}},
+    }
+    ctx = SimpleContext(attempt_context=json.dumps(attempt_context))
+    callbacks.deterministic_mcq_grading(ctx)
+    ctx.state["essay_results"] = [{"questionId": "e1", "score": 7, "maxScore": 10}]
+    callbacks.merge_cbt_results(ctx)
+    all_results = json.loads(ctx.state["all_results"])
+    assert [r["questionId"] for r in all_results] == ["m1", "e1"]
+    assert all_results[1] == {"questionId": "e1", "score": 7, "maxScore": 10}
+    assert ctx.state["obtained_score"] == 8
+
+
+# -- retrieval gate -----------------------------------------------------------
+
+_RUBRIC = {
+    "rubric_items": [
+        {
+            "question_id": "q0",
+            "criterion": "Photosynthesis converts light energy into chemical energy",
+        },
+        {
+            "question_id": "q1",
+            "criterion": "Osmosis is the diffusion of water across a membrane",
+        },
+    ],
+    "max_score": 4,
+}
+
+
+def test_needs_external_evidence() -> None:
+    close = "Photosynthesis converts light energy to chemical energy"
+    assert not callbacks.needs_external_evidence(close, _RUBRIC, "q0")
+    assert not callbacks.needs_external_evidence(close, json.dumps(_RUBRIC), "q0")
+    # Scored against its own rubric item, not q0's.
+    assert callbacks.needs_external_evidence(close, _RUBRIC, "q1")
+    assert callbacks.needs_external_evidence("when plants drink", _RUBRIC, "q1")
+    # Untagged question: compared with the whole rubric.
+    assert callbacks.needs_external_evidence("diffusion of water", _RUBRIC, "q9")
+    assert callbacks.needs_external_evidence("anything", {}, "q0")
+    assert not callbacks.needs_external_evidence("  ", _RUBRIC, "q0")
+
+
+def test_retrieval_skipped_when_the_rubric_covers_the_answer() -> None:
+    ctx = SimpleContext(
+        questions=[
+            {
+                "question_id": "q0",
+                "student_answer": "photosynthesis converts light energy into chemical energy",
+            },
+            {"question_id": "q1", "student_answer": "when plants drink"},
+        ],
+        rubric=_RUBRIC,
+        final_summary_0={"consensus_answer": "left over from an earlier run"},
+    )
+    assert "rubric covers answer" in _skipped_text(
+        callbacks.skip_retrieval_if_rubric_covers(0)(ctx)
+    )
+    assert ctx.state["final_summary_0"] is None
+    assert callbacks.skip_retrieval_if_rubric_covers(1)(ctx) is None
+    assert callbacks.skip_retrieval_if_rubric_covers(2)(ctx) is None
@@ -0,0 +1,68 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import typing
+
+import pytest
+
+from app.app_utils.coalesce import InflightCoalescer
+
+
+@pytest.mark.asyncio
+async def test_coalescer_waiter_gets_leader_result() -> None:
+    coalescer = InflightCoalescer()
+    key = InflightCoalescer.key("model", "question")
+    assert coalescer.pending(key) is None
+    with coalescer.lead(key) as future:
+        waiter = coalescer.pending(key)
+        assert waiter is not None
+        future.set_result("summary")
+    assert await asyncio.shield(waiter) == "summary"
+    assert coalescer.pending(key) is None
+
+
+@pytest.mark.asyncio
+async def test_coalescer_leader_without_result_releases_waiters_with_none() -> None:
+    coalescer = InflightCoalescer()
+    with pytest.raises(RuntimeError), coalescer.lead("k"):
+        waiter = coalescer.pending("k")
+        raise RuntimeError("leader failed")
+    assert await asyncio.shield(waiter) is None
+
+
+def test_coalescer_waiter_on_another_event_loop() -> None:
+    coalescer = InflightCoalescer()
+    leading = threading.Event()
+    release = threading.Event()
+
+    async def lead() -> None:
+        with coalescer.lead("k") as future:
+            leading.set()
+            await asyncio.get_running_loop().run_in_executor(None, release.wait)
+            future.set_result("shared")
+
+    leader = threading.Thread(target=asyncio.run, args=(lead(),))
+    leader.start()
+    assert leading.wait(5)
+
+    async def wait() -> typing.Any:
+        waiter = coalescer.pending("k")
+        assert waiter is not None
+        release.set()
+        return await asyncio.shield(waiter)
+
+    assert asyncio.run(wait()) == "shared"
+    leader.join(5)
@@ -0,0 +1,116 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import typing
+from collections.abc import AsyncGenerator
+
+import pytest
+from google.adk.agents import BaseAgent, InvocationContext
+from google.adk.events import Event, EventActions
+
+from app.agents.fan_out import ParallelLoopAgent
+from tests.unit.fakes import EmitAgent, FailAgent, run_agent
+
+
+class TwoStepAgent(BaseAgent):
+    """Writes ``step_<index>``, then records whether it was committed before continuing."""
+
+    index: int
+    delay: float
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        await asyncio.sleep(self.delay)
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={f"step_{self.index}": True}),
+        )
+        committed = ctx.session.state.get(f"step_{self.index}") is True
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(
+                state_delta={
+                    f"item_{self.index}": {"index": self.index, "committed": committed}
+                }
+            ),
+        )
+
+
+def _loop_agent(factory: typing.Any, count: int) -> ParallelLoopAgent:
+    return ParallelLoopAgent(
+        name="Loop",
+        items_key="items",
+        item_output_key="item_{index}",
+        output_key="results",
+        agent_factory=factory,
+        max_concurrency=count,
+    )
+
+
+@pytest.mark.asyncio
+async def test_parallel_loop_commits_each_child_delta_before_it_continues() -> None:
+    # Later items finish first, so input order differs from completion order.
+    agent = _loop_agent(
+        lambda i: TwoStepAgent(name=f"Step_{i}", index=i, delay=0.05 * (3 - i)), 4
+    )
+    state, _ = await run_agent(agent, {"items": [0, 1, 2, 3]})
+    assert state["results"] == [{"index": i, "committed": True} for i in range(4)]
+
+
+@pytest.mark.asyncio
+async def test_parallel_loop_parses_json_results_in_input_order() -> None:
+    agent = _loop_agent(
+        lambda i: EmitAgent(
+            name=f"Emit_{i}",
+            delta={f"item_{i}": f'```json\n{{"n": {i}}}\n```'},
+            delay=0.01 * (2 - i),
+        ),
+        3,
+    )
+    state, _ = await run_agent(agent, {"items": ["a", "b", "c"]})
+    assert state["results"] == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+
+@pytest.mark.asyncio
+async def test_parallel_loop_propagates_child_errors() -> None:
+    agent = _loop_agent(
+        lambda i: (
+            FailAgent(name=f"Fail_{i}")
+            if i == 1
+            else EmitAgent(name=f"Emit_{i}", delta={f"item_{i}": "{}"})
+        ),
+        2,
+    )
+    with pytest.raises(RuntimeError, match="Fail_1 failed"):
+        await run_agent(agent, {"items": [0, 1]})
+
+
+@pytest.mark.asyncio
+async def test_parallel_loop_rejects_a_missing_item_output() -> None:
+    agent = _loop_agent(lambda i: EmitAgent(name=f"Emit_{i}", delta={}), 1)
+    with pytest.raises(ValueError, match="produced no output for 'item_0'"):
+        await run_agent(agent, {"items": [0]})
+
+
+def test_item_index_matches_only_item_output_keys() -> None:
+    agent = _loop_agent(lambda i: EmitAgent(name=f"Emit_{i}", delta={}), 1)
+    assert agent.item_index("item_12") == 12
+    assert agent.item_index("item_x") is None
+    assert agent.item_index("results") is None
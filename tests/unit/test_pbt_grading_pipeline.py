@@ -0,0 +1,46 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+# mypy: disable-error-code="arg-type,operator"
+import json
+import typing
+
+from app.agents.pbt_grading_pipeline import (
+    create_online_answers_agent,
+    create_question_grader_agent,
+    create_summarizer_agent,
+)
+from tests.unit.fakes import SimpleContext
+
+
+def _input(agent: typing.Any, ctx: SimpleContext) -> dict[str, typing.Any]:
+    return json.loads(agent.instruction(ctx).split("INPUT:\n", 1)[1])
+
+
+def test_retrieval_agents_see_only_the_question() -> None:
+    ctx = SimpleContext(
+        questions=[
+            {"question_id": "q0", "question": "What is x?", "student_answer": "y"}
+        ],
+        online_answers_0='{"results": []}',
+    )
+    question = {"question_id": "q0", "question": "What is x?"}
+    assert _input(create_online_answers_agent(0), ctx) == question
+    assert _input(create_summarizer_agent(0), ctx) == {
+        **question,
+        "online_answers": '{"results": []}',
+    }
+    grader_input = _input(create_question_grader_agent(0), ctx)
+    assert grader_input["question"]["student_answer"] == "y"
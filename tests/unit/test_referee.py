@@ -0,0 +1,272 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import typing
+from collections.abc import AsyncGenerator, Callable
+
+import pytest
+from google.adk.agents import BaseAgent, InvocationContext
+from google.adk.events import Event
+
+from app.agents.fan_out import ParallelLoopAgent
+from app.agents.pbt_grading_pipeline import (
+    RefereeBatchAgent,
+    StreamingRefereeAgent,
+    apply_referee_corrections,
+    merge_referee_reports,
+)
+from app.app_utils.typing import RefereeReport
+from tests.unit.fakes import EmitAgent, FailAgent, RecordAgent, run_agent
+
+
+def _grader(delays: list[float], confidence: float = 0.9) -> ParallelLoopAgent:
+    return ParallelLoopAgent(
+        name="Grader",
+        items_key="questions",
+        item_output_key="graded_question_{index}",
+        output_key="graded_questions",
+        agent_factory=lambda i: EmitAgent(
+            name=f"Grade_{i}",
+            delta={
+                f"graded_question_{i}": {
+                    "question_id": f"q{i}",
+                    "score": i,
+                    "model_confidence": confidence,
+                }
+            },
+            delay=delays[i],
+        ),
+    )
+
+
+def _referees(
+    batches: list[list[str]], corrections: dict[str, float] | None = None
+) -> Callable[[int, list[dict[str, typing.Any]]], BaseAgent]:
+    """Referee factory that records each batch and corrects the given question ids."""
+
+    def factory(batch: int, graded: list[dict[str, typing.Any]]) -> BaseAgent:
+        batches.append([item["question_id"] for item in graded])
+        corrected = [
+            {
+                "question_id": item["question_id"],
+                "corrected_score": corrections[item["question_id"]],
+            }
+            for item in graded
+            if item["question_id"] in (corrections or {})
+        ]
+        report = {
+            "ok": not corrected,
+            "issues": [],
+            "corrected": corrected,
+            "status": "PENDING_REVIEW" if corrected else "COMPLETED",
+            "low_confidence_count": len(corrected),
+        }
+        return EmitAgent(
+            name=f"Referee_{batch}", delta={f"referee_report_{batch}": report}
+        )
+
+    return factory
+
+
+def _scores(state: dict[str, typing.Any]) -> list[typing.Any]:
+    return [item["score"] for item in state["graded_questions"]]
+
+
+def _questions(count: int) -> dict[str, typing.Any]:
+    return {"questions": [{"question_id": f"q{i}"} for i in range(count)]}
+
+
+@pytest.mark.asyncio
+async def test_batches_flush_when_full() -> None:
+    batches: list[list[str]] = []
+    agent = StreamingRefereeAgent(
+        name="Referee",
+        sub_agents=[_grader([0.0] * 5)],
+        agent_factory=_referees(batches),
+        batch_size=2,
+        flush_interval=10.0,
+    )
+    state, _ = await run_agent(agent, _questions(5))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert sorted(qid for batch in batches for qid in batch) == [
+        f"q{i}" for i in range(5)
+    ]
+    assert state["aggregated_stats"]["count"] == 5
+    assert state["aggregated_stats"]["total_score"] == 10
+
+
+@pytest.mark.asyncio
+async def test_batches_flush_on_timer_while_grading_continues() -> None:
+    batches: list[list[str]] = []
+    agent = StreamingRefereeAgent(
+        name="Referee",
+        sub_agents=[_grader([0.0, 0.3, 0.6])],
+        agent_factory=_referees(batches),
+        batch_size=5,
+        flush_interval=0.05,
+    )
+    await run_agent(agent, _questions(3))
+    assert batches == [["q0"], ["q1"], ["q2"]]
+
+
+@pytest.mark.asyncio
+async def test_low_confidence_items_are_reported() -> None:
+    agent = StreamingRefereeAgent(
+        name="Referee",
+        sub_agents=[_grader([0.0, 0.0], confidence=0.5)],
+        agent_factory=_referees([]),
+    )
+    state, _ = await run_agent(agent, _questions(2))
+    assert state["aggregated_stats"]["low_confidence_items"] == ["q0", "q1"]
+
+
+@pytest.mark.asyncio
+async def test_corrections_rerun_speculative_follow_up_before_after_review() -> None:
+    speculative = RecordAgent(name="Speculative", calls=[], probe=_scores)
+    after_review = RecordAgent(
+        name="AfterReview",
+        calls=[],
+        probe=lambda state: (_scores(state), len(speculative.calls)),
+    )
+    agent = StreamingRefereeAgent(
+        name="Referee",
+        sub_agents=[_grader([0.0, 0.0, 0.0]), speculative, after_review],
+        agent_factory=_referees([], corrections={"q1": 0.5}),
+    )
+    state, _ = await run_agent(agent, _questions(3))
+    assert speculative.calls == [[0, 1, 2], [0, 0.5, 2]]
+    assert after_review.calls == [([0, 0.5, 2], 2)]
+    assert state["graded_questions"][1]["original_score"] == 1
+    assert state["aggregated_stats"]["total_score"] == 2.5
+    assert '"status": "PENDING_REVIEW"' in state["referee_report"]
+
+
+@pytest.mark.asyncio
+async def test_speculative_follow_up_runs_once_without_corrections() -> None:
+    speculative = RecordAgent(name="Speculative", calls=[], probe=_scores)
+    after_review = RecordAgent(name="AfterReview", calls=[], probe=_scores)
+    agent = StreamingRefereeAgent(
+        name="Referee",
+        sub_agents=[_grader([0.0, 0.0]), speculative, after_review],
+        agent_factory=_referees([]),
+    )
+    await run_agent(agent, _questions(2))
+    assert speculative.calls == [[0, 1]]
+    assert after_review.calls == [[0, 1]]
+
+
+@pytest.mark.asyncio
+async def test_referee_errors_propagate() -> None:
+    agent = StreamingRefereeAgent(
+        name="Referee",
+        sub_agents=[_grader([0.0])],
+        agent_factory=lambda batch, graded: FailAgent(name=f"Referee_{batch}"),
+    )
+    with pytest.raises(RuntimeError, match="Referee_0 failed"):
+        await run_agent(agent, _questions(1))
+
+
+class InvalidReportAgent(BaseAgent):
+    """Fails the way LlmAgent does when its reply doesn't match output_schema."""
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        RefereeReport.model_validate_json('{"ok": "maybe"}')
+        yield  # pragma: no cover
+
+
+@pytest.mark.asyncio
+async def test_an_invalid_referee_report_skips_only_its_batch() -> None:
+    def factory(batch: int, graded: list[dict[str, typing.Any]]) -> BaseAgent:
+        if batch == 0:
+            return RefereeBatchAgent(
+                name="RefereeBatch_0", sub_agents=[InvalidReportAgent(name="Invalid")]
+            )
+        return _referees([], corrections={"q1": 0.5})(batch, graded)
+
+    agent = StreamingRefereeAgent(
+        name="Referee",
+        sub_agents=[_grader([0.0, 0.0])],
+        agent_factory=factory,
+        batch_size=1,
+    )
+    state, _ = await run_agent(agent, _questions(2))
+    assert _scores(state) == [0, 0.5]
+    assert '"status": "PENDING_REVIEW"' in state["referee_report"]
+
+
+def test_apply_referee_corrections() -> None:
+    graded = [
+        {"question_id": "q0", "score": 4},
+        {"question_id": "q1", "score": 2},
+        {"question_id": "q2", "score": 3},
+    ]
+    corrected = [
+        {"question_id": "q0", "corrected_score": 1},
+        {"question_id": "q1", "corrected_score": 2},
+        {"question_id": "q2", "corrected_score": None},
+        {"question_id": "q9", "corrected_score": 5},
+    ]
+    reconciled, delta = apply_referee_corrections(graded, corrected)
+    assert reconciled == [
+        {"question_id": "q0", "score": 1, "original_score": 4},
+        {"question_id": "q1", "score": 2},
+        {"question_id": "q2", "score": 3},
+    ]
+    assert delta == -3
+    assert graded[0]["score"] == 4
+
+
+def test_apply_referee_corrections_clamps_to_the_item_range() -> None:
+    graded = [
+        {"question_id": "q0", "score": 2, "max_score": 4},
+        {"question_id": "q1", "score": 2, "max_score": 4},
+    ]
+    corrected = [
+        {"question_id": "q0", "corrected_score": 9},
+        {"question_id": "q1", "corrected_score": -1},
+    ]
+    reconciled, delta = apply_referee_corrections(graded, corrected)
+    assert [item["score"] for item in reconciled] == [4, 0]
+    assert delta == 0
+
+
+def test_merge_referee_reports() -> None:
+    merged = merge_referee_reports(
+        [
+            {
+                "ok": True,
+                "issues": [],
+                "corrected": [],
+                "status": "COMPLETED",
+                "low_confidence_count": 0,
+            },
+            {
+                "ok": False,
+                "issues": [{"question_id": "q3", "issue": "x"}],
+                "corrected": [{"question_id": "q3", "corrected_score": 1}],
+                "status": "PENDING_REVIEW",
+                "low_confidence_count": 2,
+            },
+        ]
+    )
+    assert merged == {
+        "ok": False,
+        "issues": [{"question_id": "q3", "issue": "x"}],
+        "corrected": [{"question_id": "q3", "corrected_score": 1}],
+        "status": "PENDING_REVIEW",
+        "low_confidence_count": 2,
+    }
+    assert merge_referee_reports([])["status"] == "COMPLETED"